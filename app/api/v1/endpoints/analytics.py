@@ -18,6 +18,7 @@ from app.schemas.analytics import (
 )
 from app.utils.llm_integration import call_teacher_llm
 from app.utils.gamification import calculate_study_streak
+from app.utils.progress_utils import STUDY_PLAN_ID_PREFIX
 import json
 
 router = APIRouter()
@@ -519,7 +520,7 @@ async def generate_adaptive_learning_path(
         )
 
     # Criar ID do plano
-    path_id = f"path_{user_id}_{int(datetime.utcnow().timestamp())}"
+    path_id = f"{STUDY_PLAN_ID_PREFIX}{user_id}_{int(datetime.utcnow().timestamp())}"
 
     # Salvar plano
     path_metadata = {
@@ -4,6 +4,7 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 import time
+from google.cloud.firestore import SERVER_TIMESTAMP
 from app.services.event_service import event_service, EventTypes
 
 from app.core.security import (
@@ -169,7 +170,8 @@ async def login(
     # Atualizar último login
     user_id = user_doc.id if hasattr(user_doc, 'id') else username
     db.collection(Collections.USERS).document(user_id).update({
-        "last_login": time.time()
+        "last_login": time.time(),
+        "updated_at": SERVER_TIMESTAMP
     })
 
     # Criar token de acesso
@@ -2,8 +2,9 @@
 from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 import time
+from google.cloud.firestore import SERVER_TIMESTAMP, FieldPath
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_slim
 from app.database import get_db, Collections
 from app.schemas.content import (
     AreaListResponse,
@@ -14,6 +15,8 @@ from app.schemas.content import (
     ContentMetadataResponse
 )
 from app.utils.gamification import add_user_xp
+from app.utils.cache_system import invalidate_progress_cache
+from app.utils.progress_utils import get_area_data, build_saved_progress_update
 
 router = APIRouter()
 
@@ -21,6 +24,33 @@ router = APIRouter()
 VALID_LEVELS = ["iniciante", "intermediário", "avançado"]
 
 
+def get_area_fields(db, area_name: str, *field_paths: tuple) -> Dict[str, Any]:
+    """
+    Lê apenas os campos indicados do documento da área (máscara de campos)
+
+    Os documentos de learning_paths contêm o currículo completo; rotas que
+    detalham uma subárea, nível ou módulo só precisam de um ramo dele.
+
+    Args:
+        field_paths: Caminhos como tuplas de segmentos, ex. ("subareas", nome);
+            os nomes podem conter espaços e acentos, por isso usamos FieldPath
+
+    Raises:
+        HTTPException 404 se a área não existir
+    """
+    area_doc = db.collection(Collections.LEARNING_PATHS).document(area_name).get(
+        field_paths=[FieldPath(*path).to_api_repr() for path in field_paths]
+    )
+
+    if not area_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Área '{area_name}' não encontrada"
+        )
+
+    return area_doc.to_dict() or {}
+
+
 # Adicionar função de validação
 def normalize_level_name(level: str) -> str:
     """Normaliza o nome do nível para o padrão correto"""
@@ -169,17 +199,8 @@ async def get_subarea_details(
     - Recursos específicos
     - Informações de carreira
     """
-    # Buscar dados da área
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area_name)
-    area_doc = area_ref.get()
-
-    if not area_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Área '{area_name}' não encontrada"
-        )
-
-    area_data = area_doc.to_dict()
+    # Buscar apenas a subárea no documento da área
+    area_data = get_area_fields(db, area_name, ("subareas", subarea_name))
     subareas = area_data.get("subareas", {})
 
     if subarea_name not in subareas:
@@ -232,7 +253,7 @@ async def get_subarea_details(
 async def set_current_area(
         area_name: str,
         subarea_name: Optional[str] = Query(None, description="Subárea inicial"),
-        current_user: dict = Depends(get_current_user),
+        current_user: dict = Depends(get_current_user_slim),
         db=Depends(get_db)
 ) -> Any:
     """
@@ -242,21 +263,19 @@ async def set_current_area(
     user_id = current_user["id"]
     old_track = current_user.get("current_track", "")
 
-    # Verificar se a área existe
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area_name)
-    area_doc = area_ref.get()
+    # Verificar se a área existe (só as subáreas são usadas: currículo em cache)
+    area_index = get_area_data(db, area_name)
 
-    if not area_doc.exists:
+    if area_index is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Área '{area_name}' não encontrada"
         )
 
-    area_data = area_doc.to_dict()
+    subareas = list(area_index["subareas"])
 
     # Se não especificou subárea, pegar a primeira disponível
     if not subarea_name:
-        subareas = list(area_data.get("subareas", {}).keys())
         if subareas:
             subarea_name = subareas[0]
 
@@ -273,7 +292,7 @@ async def set_current_area(
         # Criar novo progresso - SEMPRE DO INÍCIO
         new_progress = {
             "area": area_name,
-            "subareas_order": list(area_data.get("subareas", {}).keys()),
+            "subareas_order": subareas,
             "current": {
                 "subarea": subarea_name or "",
                 "level": "iniciante",
@@ -283,14 +302,17 @@ async def set_current_area(
             }
         }
 
-    # Atualizar usuário
+    # Atualizar usuário (apenas a entrada da área anterior em saved_progress)
     updates = {
         "current_track": area_name,
-        "progress": new_progress,
-        "saved_progress": saved_progress
+        "progress": new_progress
     }
+    if old_track and old_track != area_name and "progress" in current_user:
+        updates.update(build_saved_progress_update(old_track, current_user["progress"]))
 
+    updates["updated_at"] = SERVER_TIMESTAMP
     db.collection(Collections.USERS).document(user_id).update(updates)
+    invalidate_progress_cache(user_id)
 
     # Adicionar XP
     from app.utils.gamification import add_user_xp, grant_badge
@@ -412,17 +434,8 @@ async def get_level_details(
     - Objetivos de aprendizagem
     - Projetos e avaliações
     """
-    # Buscar dados da área
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area_name)
-    area_doc = area_ref.get()
-
-    if not area_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Área '{area_name}' não encontrada"
-        )
-
-    area_data = area_doc.to_dict()
+    # Buscar apenas o nível no documento da área
+    area_data = get_area_fields(db, area_name, ("subareas", subarea_name, "levels", level_name))
     subareas = area_data.get("subareas", {})
 
     if subarea_name not in subareas:
@@ -486,17 +499,8 @@ async def get_module_details(
     - Avaliação do módulo
     - Recursos adicionais
     """
-    # Buscar dados da área
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area_name)
-    area_doc = area_ref.get()
-
-    if not area_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Área '{area_name}' não encontrada"
-        )
-
-    area_data = area_doc.to_dict()
+    # Buscar apenas os módulos do nível no documento da área
+    area_data = get_area_fields(db, area_name, ("subareas", subarea_name, "levels", level_name, "modules"))
 
     # Navegar até o módulo
     try:
@@ -557,17 +561,14 @@ async def get_content_metadata(
 
     area_name = parts[0]
 
-    # Buscar dados da área
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area_name)
-    area_doc = area_ref.get()
-
-    if not area_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Área '{area_name}' não encontrada"
-        )
+    # Buscar apenas os metadados da área e do conteúdo específico
+    field_paths = [("meta",)]
+    if len(parts) > 1 and content_type == "subarea":
+        field_paths.append(("subareas", parts[1], "meta"))
+    elif len(parts) > 2 and content_type == "level":
+        field_paths.append(("subareas", parts[1], "levels", parts[2], "meta"))
 
-    area_data = area_doc.to_dict()
+    area_data = get_area_fields(db, area_name, *field_paths)
     metadata = area_data.get("meta", {})
 
     # Se for conteúdo mais específico, buscar metadados específicos
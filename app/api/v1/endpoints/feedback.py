@@ -38,6 +38,7 @@ async def collect_feedback(
     user_id = current_user["id"]
 
     # Preparar dados de feedback
+    now = time.time()
     feedback_data = {
         "user_id": user_id,
         "session_type": request.session_type,
@@ -46,8 +47,8 @@ async def collect_feedback(
         "ratings": request.ratings.dict() if request.ratings else {},
         "missing_topics": request.missing_topics,
         "suggestions": request.suggestions,
-        "timestamp": time.time(),
-        "date": time.strftime("%Y-%m-%d"),
+        "timestamp": now,
+        "date": time.strftime("%Y-%m-%d", time.localtime(now)),
         "context": request.context or {}
     }
 
@@ -4,6 +4,7 @@
 from typing import Dict, List, Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
 import time
+from google.cloud.firestore import SERVER_TIMESTAMP
 import uuid
 from collections import defaultdict
 import os
@@ -21,7 +22,8 @@ from app.schemas.mapping import (
     SubareaRecommendation,
     MappingHistory
 )
-from app.utils.gamification import add_user_xp, grant_badge, XP_REWARDS
+from app.utils.gamification import add_user_xp, grant_badge, get_strongest_area, XP_REWARDS
+from app.utils.cache_system import invalidate_user_cache
 from app.utils.hybrid_interest_mapper import HybridInterestMapper
 from app.config import TRACK_DESCRIPTIONS
 
@@ -567,13 +569,16 @@ async def submit_mapping(
     updates = {
         "recommended_track": recommended_track,
         "track_scores": normalized_scores,
+        "strongest_area": get_strongest_area(normalized_scores),
         "mapping_history": current_user.get("mapping_history", []) + [mapping_record]
     }
 
     # NÃO configurar progresso ainda - isso será feito quando escolher subárea
 
     # Atualizar no banco
+    updates["updated_at"] = SERVER_TIMESTAMP
     user_ref.update(updates)
+    invalidate_user_cache(current_user["id"])
 
     # Adicionar XP e badges
     xp_earned = XP_REWARDS.get("complete_mapping", 25)
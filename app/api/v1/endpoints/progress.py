@@ -1,11 +1,19 @@
 # app/api/v1/endpoints/progress.py
-from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from google.cloud.firestore import ArrayUnion
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+from functools import lru_cache, partial
+from itertools import chain
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from google.cloud.firestore import ArrayUnion, ArrayRemove, Increment, SERVER_TIMESTAMP
+import orjson
 import time
+import unicodedata
+from types import MappingProxyType
 from datetime import datetime, timedelta, date
 import logging
-from app.core.security import get_current_user, get_current_user_id_required
+from app.core.security import get_current_user, get_current_user_id_required, get_current_user_slim
+from app.config import get_settings
 from app.database import get_db, Collections
 from app.schemas.progress import (
     ProgressResponse,
@@ -23,13 +31,69 @@ from app.schemas.progress import (
     SpecializationStartRequest,
     InitializeProgressRequest
 )
-from app.utils.gamification import add_user_xp, grant_badge, XP_REWARDS, calculate_study_streak
-from app.utils.llm_integration import generate_complete_lesson, call_teacher_llm
+from app.utils.gamification import (
+    add_user_xp_async,
+    grant_badge_async,
+    XP_REWARDS,
+    calculate_study_streak,
+    build_study_streak_update,
+    get_stored_study_streak,
+    get_strongest_area,
+    completions_migrated,
+    get_last_study_date,
+    date_to_timestamp,
+    build_daily_stats,
+    build_daily_stats_update,
+    get_daily_stats,
+    PROGRESS_STATS_VERSION
+)
+from app.utils.write_coalescer import write_coalescer, PendingWrites
+from app.utils.llm_integration import generate_complete_lesson, call_teacher_llm, LLM_ERROR_PREFIX
+from app.utils.llm_cache import (
+    build_content_cache_key,
+    get_cached_content,
+    get_age_bucket,
+    get_content_job,
+    get_content_stream,
+    claim_content_job,
+    run_content_job,
+    CONTENT_JOB_TIMEOUT,
+    acquire_prefetch_slot,
+    release_prefetch_slot,
+    run_prefetch_job
+)
+from app.utils.cache_system import (
+    progress_cache,
+    next_content_cache,
+    progress_cache_key,
+    progress_cache_version,
+    progress_etag,
+    body_etag,
+    invalidate_progress_cache,
+    invalidate_user_cache
+)
 from app.utils.progress_utils import (
-    get_user_progress,
-    advance_user_progress,
-    calculate_progress_percentage,
-    get_next_recommendations
+    get_user_progress_async,
+    advance_user_progress_async,
+    calculate_progress_percentage_async,
+    get_area_data,
+    get_areas_data,
+    get_area_ids,
+    get_next_level_in_order,
+    LEVELS_ORDER,
+    LEVEL_INDEX,
+    claim_completion_async,
+    backfill_completions,
+    release_completion_async,
+    build_completion_id,
+    build_legacy_completion_id,
+    get_completion_id,
+    get_stored_progress_percentage,
+    build_progress_percentage_update,
+    build_saved_progress_update,
+    get_last_completion_date,
+    update_position_if_unchanged,
+    POSITION_FIELDS
 )
 
 # IMPORTAR O SERVIÇO DE EVENTOS
@@ -37,6 +101,60 @@ from app.services.event_service import event_service, EventTypes
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# O cliente sempre revalida as respostas de progresso via ETag
+PROGRESS_CACHE_CONTROL = "private, no-cache"
+
+# Intervalos (s) de /content/{job_id}/stream: leitura dos trechos de um job
+# deste processo e consulta ao estado de um job de outro worker
+CONTENT_STREAM_INTERVAL = 0.05
+CONTENT_JOB_POLL_INTERVAL = 1.0
+
+# Contadores desnormalizados em "stats" e o array legado de onde cada um é derivado
+STATS_COUNTERS = {
+    "completed_lessons_count": "completed_lessons",
+    "completed_modules_count": "completed_modules",
+    "completed_levels_count": "completed_levels",
+    "completed_projects_count": "completed_projects",
+    "certifications_count": "certifications",
+}
+
+# Minutos estimados de estudo por item concluído
+STUDY_MINUTES = {
+    "completed_lessons_count": 30,
+    "completed_modules_count": 60,
+    "completed_projects_count": 120,
+}
+
+# Recompensas de XP resolvidas uma única vez na importação
+XP_COMPLETE_LESSON = XP_REWARDS.get("complete_lesson", 10)
+XP_COMPLETE_MODULE = XP_REWARDS.get("complete_module", 15)
+XP_START_PROJECT = XP_REWARDS.get("start_project", 10)
+XP_START_FINAL_PROJECT = 15
+XP_COMPLETE_PROJECT = XP_REWARDS.get("complete_project", 25)
+XP_COMPLETE_FINAL_PROJECT = XP_REWARDS.get("complete_final_project", 50)
+XP_START_SPECIALIZATION = XP_REWARDS.get("start_specialization", 20)
+
+# XP por conclusão de nível, indexado pelo nome normalizado (sem acentos)
+LEVEL_XP_REWARDS = MappingProxyType({
+    "iniciante": XP_REWARDS.get("complete_level", 30),
+    "basico": XP_REWARDS.get("complete_level", 30),
+    "intermediario": XP_REWARDS.get("complete_level_intermediate", 40),
+    "avancado": XP_REWARDS.get("complete_level_advanced", 50),
+})
+DEFAULT_LEVEL_XP = XP_REWARDS.get("complete_level", 30)
+
+
+@lru_cache(maxsize=256)
+def normalize_level_name(level_name: str) -> str:
+    """
+    Remove acentos e caixa do nome do nível ("Avançado" -> "avancado")
+
+    Os nomes de nível formam um conjunto pequeno, então o resultado é memoizado.
+    """
+    return unicodedata.normalize("NFKD", level_name or "").encode("ascii", "ignore").decode().strip().lower()
+
 # Adicionar estas funções auxiliares ao início do arquivo progress.py
 
 def ensure_navigation_context(user_data: dict, db) -> Dict[str, Any]:
@@ -91,22 +209,19 @@ def ensure_navigation_context(user_data: dict, db) -> Dict[str, Any]:
         if not area:
             area = default_area
 
-    # Se não tem subárea, buscar da estrutura da área
+    # Se não tem subárea, preferir a ordem de progresso (sem ler o currículo)
+    if not subarea:
+        subareas_order = progress.get("subareas_order", [])
+        if subareas_order:
+            subarea = subareas_order[0]
+
+    # Só então buscar da estrutura da área
     if not subarea:
         try:
-            area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-            area_doc = area_ref.get()
-
-            if area_doc.exists:
-                area_data = area_doc.to_dict()
-                subareas = list(area_data.get("subareas", {}).keys())
-                if subareas:
-                    # Preferir subárea da ordem de progresso se existir
-                    subareas_order = progress.get("subareas_order", [])
-                    if subareas_order:
-                        subarea = subareas_order[0]
-                    else:
-                        subarea = subareas[0]
+            area_index = get_area_data(db, area)
+
+            if area_index is not None and area_index["subareas"]:
+                subarea = area_index["subareas"][0]
         except:
             pass
 
@@ -124,6 +239,28 @@ def ensure_navigation_context(user_data: dict, db) -> Dict[str, Any]:
     }
 
 
+async def load_navigation_context(user_data: dict, db) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Resolve o contexto de navegação e o currículo indexado da área
+
+    Quando o progresso já tem área, ensure_navigation_context a mantém, então o
+    currículo é buscado em paralelo; caso contrário depende da área resolvida.
+
+    Returns:
+        Tupla (contexto de navegação, índice de get_area_data ou None)
+    """
+    progress_area = user_data.get("progress", {}).get("area")
+    if not progress_area:
+        nav_context = await asyncio.to_thread(ensure_navigation_context, user_data, db)
+        return nav_context, await asyncio.to_thread(get_area_data, db, nav_context["area"])
+
+    nav_context, area_index = await asyncio.gather(
+        asyncio.to_thread(ensure_navigation_context, user_data, db),
+        asyncio.to_thread(get_area_data, db, progress_area)
+    )
+    return nav_context, area_index
+
+
 @router.get("/xp-info")
 async def get_xp_info(
         current_user: dict = Depends(get_current_user)
@@ -148,78 +285,142 @@ async def get_xp_info(
         "achievements_count": len(current_user.get("badges", []))
     }
 
-def get_next_available_content(area_data: dict, current_context: dict, db) -> Dict[str, Any]:
+
+def normalize_content_position(
+        area_index: dict,
+        subarea: str,
+        level: str,
+        module_idx: int,
+        lesson_idx: int,
+        step_idx: int
+) -> Tuple[int, int, int, List[Tuple[int, ...]]]:
+    """
+    Avança a posição para além de lições e módulos já esgotados
+
+    Percorre o índice da área com aritmética simples, sem escrever nada, até
+    parar em um conteúdo válido, em um módulo sem lições ou no fim do nível.
+
+    Returns:
+        Tupla (module_idx, lesson_idx, step_idx, concluídos): concluídos lista
+        (módulo,) para cada módulo e (módulo, lição) para cada lição ultrapassados
+        rumo a uma posição válida; module_idx igual ao número de módulos indica
+        nível concluído
+    """
+    sizes = area_index["sizes"]
+    module_count = sizes.get((subarea, level), 0)
+    completed = []
+
+    while module_idx < module_count:
+        lesson_count = sizes[(subarea, level, module_idx)]
+        if not lesson_count:
+            break
+
+        if lesson_idx >= lesson_count:
+            if module_idx + 1 < module_count:
+                completed.append((module_idx,))
+            module_idx, lesson_idx, step_idx = module_idx + 1, 0, 0
+            continue
+
+        total_steps = sizes[(subarea, level, module_idx, lesson_idx)]
+        if total_steps and step_idx >= total_steps:
+            if lesson_idx + 1 < lesson_count:
+                completed.append((module_idx, lesson_idx))
+            lesson_idx, step_idx = lesson_idx + 1, 0
+            continue
+
+        break
+
+    return module_idx, lesson_idx, step_idx, completed
+
+
+def get_next_available_content(area_index: dict, current_context: dict, db) -> Dict[str, Any]:
     """
     Encontra o próximo conteúdo disponível quando o atual está completo
+
+    O resultado depende apenas do currículo e de (área, subárea, nível), então é
+    memorizado por next_content_cache com o mesmo TTL do currículo; quem o
+    recebe não deve modificá-lo.
+
+    Args:
+        area_index: Currículo indexado da área atual (get_area_data)
+    """
+    cache_key = f"{current_context['area']}|{current_context['subarea']}|{current_context['level']}"
+    next_content = next_content_cache.get(cache_key)
+    if next_content is not None:
+        return next_content
+
+    next_content, cacheable = find_next_available_content(area_index, current_context, db)
+    if cacheable:
+        next_content_cache.set(cache_key, next_content)
+
+    return next_content
+
+
+def find_next_available_content(area_index: dict, current_context: dict, db) -> Tuple[Dict[str, Any], bool]:
+    """
+    Calcula o próximo conteúdo disponível a partir do currículo
+
+    Returns:
+        Tupla (próximo conteúdo, cacheável); falhas ao consultar as outras áreas
+        não são memorizadas
     """
     area = current_context["area"]
     subarea = current_context["subarea"]
     level = current_context["level"]
 
-    levels_order = ["iniciante", "intermediário", "avançado"]
-    subareas = list(area_data.get("subareas", {}).keys())
+    area_data = area_index["data"]
+    subareas = area_index["subareas"]
 
     # Verificar próximo nível na mesma subárea
-    if level in levels_order:
-        current_level_idx = levels_order.index(level)
-        if current_level_idx < len(levels_order) - 1:
-            next_level = levels_order[current_level_idx + 1]
-            subarea_data = area_data.get("subareas", {}).get(subarea, {})
-            if next_level in subarea_data.get("levels", {}):
-                return {
-                    "type": "next_level",
-                    "area": area,
-                    "subarea": subarea,
-                    "level": next_level,
-                    "module_index": 0,
-                    "lesson_index": 0,
-                    "step_index": 0
-                }
-
-    # Verificar próxima subárea
-    if subarea in subareas:
-        current_subarea_idx = subareas.index(subarea)
-        if current_subarea_idx < len(subareas) - 1:
-            next_subarea = subareas[current_subarea_idx + 1]
+    next_level = get_next_level_in_order(level)
+    if next_level:
+        subarea_data = area_data.get("subareas", {}).get(subarea, {})
+        if next_level in subarea_data.get("levels", {}):
             return {
-                "type": "next_subarea",
+                "type": "next_level",
                 "area": area,
-                "subarea": next_subarea,
-                "level": "iniciante",
+                "subarea": subarea,
+                "level": next_level,
                 "module_index": 0,
                 "lesson_index": 0,
                 "step_index": 0
-            }
+            }, True
+
+    # Verificar próxima subárea
+    current_subarea_idx = area_index["subarea_index"].get(subarea)
+    if current_subarea_idx is not None and current_subarea_idx < len(subareas) - 1:
+        next_subarea = subareas[current_subarea_idx + 1]
+        return {
+            "type": "next_subarea",
+            "area": area,
+            "subarea": next_subarea,
+            "level": "iniciante",
+            "module_index": 0,
+            "lesson_index": 0,
+            "step_index": 0
+        }, True
 
     # Verificar outras áreas disponíveis
+    cacheable = True
     try:
-        areas_ref = db.collection(Collections.LEARNING_PATHS).stream()
-        other_areas = []
-        for area_doc in areas_ref:
-            if area_doc.id != area:
-                other_areas.append(area_doc.id)
-
-        if other_areas:
-            # Buscar primeira subárea da nova área
-            new_area = other_areas[0]
-            new_area_ref = db.collection(Collections.LEARNING_PATHS).document(new_area)
-            new_area_doc = new_area_ref.get()
-
-            if new_area_doc.exists:
-                new_area_data = new_area_doc.to_dict()
-                new_subareas = list(new_area_data.get("subareas", {}).keys())
-                if new_subareas:
-                    return {
-                        "type": "new_area",
-                        "area": new_area,
-                        "subarea": new_subareas[0],
-                        "level": "iniciante",
-                        "module_index": 0,
-                        "lesson_index": 0,
-                        "step_index": 0
-                    }
+        other_areas = [area_id for area_id in get_area_ids(db) if area_id != area]
+
+        # Buscar a primeira área (na ordem) que possua subáreas, lendo todas de uma vez
+        other_indexes = get_areas_data(db, other_areas)
+        for new_area in other_areas:
+            new_area_index = other_indexes.get(new_area)
+            if new_area_index is not None and new_area_index["subareas"]:
+                return {
+                    "type": "new_area",
+                    "area": new_area,
+                    "subarea": new_area_index["subareas"][0],
+                    "level": "iniciante",
+                    "module_index": 0,
+                    "lesson_index": 0,
+                    "step_index": 0
+                }, True
     except:
-        pass
+        cacheable = False
 
     # Se não encontrou nada, retornar sugestão de especialização
     return {
@@ -227,12 +428,65 @@ def get_next_available_content(area_data: dict, current_context: dict, db) -> Di
         "area": area,
         "subarea": subarea,
         "message": "Você completou todo o conteúdo básico! Que tal iniciar uma especialização?"
-    }
+    }, cacheable
+
+
+def apply_progress_cache_headers(
+        request: Request,
+        response: Response,
+        user_id: str,
+        endpoint: str,
+        version: str
+) -> Optional[Response]:
+    """
+    Define Cache-Control/ETag da resposta de progresso
+
+    Returns:
+        Resposta 304 se o cliente já possui a versão atual, None caso contrário
+    """
+    etag = progress_etag(user_id, endpoint, version)
+    response.headers["Cache-Control"] = PROGRESS_CACHE_CONTROL
+    response.headers["ETag"] = etag
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"Cache-Control": PROGRESS_CACHE_CONTROL, "ETag": etag}
+        )
+
+    return None
+
+
+def build_current_content_response(request: Request, content: Dict[str, Any], status_code: int) -> Response:
+    """
+    Serializa a resposta de /current-content com ETag
+
+    O conteúdo depende também dos jobs de geração, não só de "updated_at",
+    então o ETag é o hash do corpo serializado. O 304 não poupa o trabalho no
+    servidor, mas evita retransmitir o conteúdo gerado a clientes que repetem
+    a consulta. Respostas de job pendente (202) não recebem ETag.
+    """
+    content_response = ORJSONResponse(content, status_code=status_code)
+    if status_code != status.HTTP_200_OK:
+        return content_response
+
+    etag = body_etag(content_response.body)
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"Cache-Control": PROGRESS_CACHE_CONTROL, "ETag": etag}
+        )
 
+    content_response.headers["Cache-Control"] = PROGRESS_CACHE_CONTROL
+    content_response.headers["ETag"] = etag
+    return content_response
 
-@router.get("/current", response_model=ProgressResponse)
+
+@router.get("/current", response_model=ProgressResponse, response_class=ORJSONResponse)
 async def get_current_progress(
-        current_user: dict = Depends(get_current_user),
+        request: Request,
+        response: Response,
+        current_user: dict = Depends(get_current_user_slim),
         db=Depends(get_db)
 ) -> Any:
     """
@@ -240,12 +494,23 @@ async def get_current_progress(
     SEMPRE retorna campos completos mesmo que sejam valores padrão
     """
     user_id = current_user["id"]
+    version = progress_cache_version(current_user)
 
-    # CORREÇÃO: Sempre garantir contexto válido
-    nav_context = ensure_navigation_context(current_user, db)
+    not_modified = apply_progress_cache_headers(request, response, user_id, "current", version)
+    if not_modified is not None:
+        return not_modified
+
+    cache_key = progress_cache_key(user_id, "current", version)
+    cached = progress_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    # Buscar progresso do usuário
-    progress = get_user_progress(db, user_id)
+    # CORREÇÃO: Sempre garantir contexto válido
+    # Contexto de navegação e progresso são leituras independentes
+    nav_context, progress = await asyncio.gather(
+        asyncio.to_thread(ensure_navigation_context, current_user, db),
+        get_user_progress_async(db, user_id)
+    )
 
     # Se não tem progresso ou está incompleto, criar/corrigir
     if not progress or not progress.get("area") or not progress.get("current", {}).get("subarea"):
@@ -264,10 +529,18 @@ async def get_current_progress(
 
         # Salvar progresso padrão
         user_ref = db.collection(Collections.USERS).document(user_id)
-        user_ref.update({"progress": progress})
-
-    # IMPORTANTE: Garantir que SEMPRE retornamos valores válidos
-    return ProgressResponse(
+        await asyncio.to_thread(user_ref.update, {"progress": progress, "updated_at": SERVER_TIMESTAMP})
+        invalidate_progress_cache(user_id)
+
+    # Porcentagem desnormalizada; recalculada apenas se ausente ou desatualizada
+    progress_percentage = get_stored_progress_percentage(progress)
+    if progress_percentage is None:
+        progress_percentage = await calculate_progress_percentage_async(db, user_id, progress)
+
+    # IMPORTANTE: Garantir que SEMPRE retornamos valores válidos. Os valores vêm
+    # do Firestore/nav_context; model_construct dispensa a validação na criação,
+    # pois o FastAPI já valida a resposta contra o response_model
+    result = ProgressResponse.model_construct(
         user_id=user_id,
         area=progress.get("area") or nav_context["area"],
         subarea=progress.get("current", {}).get("subarea") or nav_context["subarea"],
@@ -275,11 +548,157 @@ async def get_current_progress(
         module_index=progress.get("current", {}).get("module_index", 0),
         lesson_index=progress.get("current", {}).get("lesson_index", 0),
         step_index=progress.get("current", {}).get("step_index", 0),
-        progress_percentage=calculate_progress_percentage(db, user_id, progress) or 0.0,
+        progress_percentage=progress_percentage or 0.0,
         subareas_order=progress.get("subareas_order", []),
         last_updated=time.time()
     )
 
+    progress_cache.set(cache_key, result)
+    return result
+
+
+@router.get("/path", response_model=UserProgressPath, response_class=ORJSONResponse)
+async def get_user_progress_path(
+        request: Request,
+        response: Response,
+        current_user: dict = Depends(get_current_user_slim),
+        db=Depends(get_db)
+) -> Any:
+    """
+    Obtém o caminho de aprendizado do usuário na área atual
+    """
+    user_id = current_user["id"]
+    version = progress_cache_version(current_user)
+
+    not_modified = apply_progress_cache_headers(request, response, user_id, "path", version)
+    if not_modified is not None:
+        return not_modified
+
+    cache_key = progress_cache_key(user_id, "path", version)
+    cached = progress_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    nav_context, area_index = await load_navigation_context(current_user, db)
+    progress = current_user.get("progress", {})
+
+    # Subáreas disponíveis na área atual
+    available_subareas = []
+    if area_index is not None:
+        available_subareas = list(area_index["subareas"])
+
+    progress_percentage = get_stored_progress_percentage(progress)
+    if progress_percentage is None:
+        progress_percentage = await calculate_progress_percentage_async(db, user_id, progress)
+
+    result = UserProgressPath.model_construct(
+        area=nav_context["area"],
+        available_subareas=available_subareas,
+        current_subarea=nav_context["subarea"],
+        current_level=nav_context["level"],
+        subareas_order=progress.get("subareas_order") or available_subareas,
+        progress_percentage=progress_percentage or 0.0
+    )
+
+    progress_cache.set(cache_key, result)
+    return result
+
+
+async def prepare_completion_writes(
+        db,
+        user_id: str,
+        xp_amount: int,
+        xp_reason: str,
+        badge_name: Optional[str] = None,
+        advance_step: Optional[str] = None
+) -> Tuple[PendingWrites, Dict[str, Any], bool]:
+    """
+    Executa as leituras de add_user_xp, grant_badge e advance_user_progress em
+    paralelo, apenas preparando suas escritas
+
+    Nada é gravado aqui, então a preparação pode rodar junto com as leituras
+    de validação do endpoint e ser descartada se a requisição for rejeitada.
+
+    Returns:
+        Tupla (escritas pendentes, resultado de add_user_xp, badge concedida)
+    """
+    writes = PendingWrites()
+
+    tasks = [add_user_xp_async(db, user_id, xp_amount, xp_reason, batch=writes)]
+    if badge_name:
+        tasks.append(grant_badge_async(db, user_id, badge_name, batch=writes))
+    if advance_step:
+        tasks.append(advance_user_progress_async(db, user_id, advance_step, batch=writes))
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    xp_result = results[0]
+    badge_result = results[1] if badge_name else False
+    advance_result = results[-1] if advance_step else None
+
+    if isinstance(xp_result, Exception):
+        logger.error(f"Erro ao adicionar XP para {user_id}: {xp_result}")
+        xp_result = {"new_xp": None, "new_level": None, "level_up": False, "xp_added": 0}
+
+    if isinstance(badge_result, Exception):
+        logger.error(f"Erro ao conceder badge para {user_id}: {badge_result}")
+        badge_result = False
+
+    if isinstance(advance_result, Exception):
+        logger.error(f"Erro ao avançar progresso para {user_id}: {advance_result}")
+
+    return writes, xp_result, badge_result
+
+
+async def commit_completion_writes(db, user_id: str, writes: PendingWrites, updates: Dict[str, Any]):
+    """
+    Grava o registro de conclusão junto com as escritas preparadas em
+    prepare_completion_writes, em um único batch
+    """
+    user_ref = db.collection(Collections.USERS).document(user_id)
+    ops = [(user_ref, updates)] + writes.ops
+
+    try:
+        await write_coalescer.update_many(db, user_id, ops)
+    except Exception as e:
+        logger.error(f"Erro ao registrar conclusão para {user_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao registrar conclusão"
+        )
+
+    invalidate_user_cache(user_id)
+
+
+async def apply_completion_writes(
+        db,
+        user_id: str,
+        updates: Dict[str, Any],
+        xp_amount: int,
+        xp_reason: str,
+        badge_name: Optional[str] = None,
+        advance_step: Optional[str] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Grava o registro de conclusão, o XP, a badge e o avanço de progresso em um
+    único batch
+
+    As leituras de add_user_xp, grant_badge e advance_user_progress rodam em
+    paralelo e suas escritas são apenas preparadas; tudo é gravado de uma vez
+    pelo write_coalescer (que ainda agrupa conclusões simultâneas do mesmo
+    usuário), então a conclusão é atômica e não precisa de estorno.
+
+    Args:
+        advance_step: Tipo de avanço ("lesson", "module", "level") a aplicar junto
+
+    Returns:
+        Tupla (resultado de add_user_xp, badge concedida)
+    """
+    writes, xp_result, badge_result = await prepare_completion_writes(
+        db, user_id, xp_amount, xp_reason, badge_name, advance_step
+    )
+    await commit_completion_writes(db, user_id, writes, updates)
+    return xp_result, badge_result
+
 
 @router.post("/lesson/complete")
 async def complete_lesson(
@@ -292,38 +711,63 @@ async def complete_lesson(
     """
     user_id = current_user["id"]
 
-    # Criar ID único para a lição
-    lesson_id = f"{request.area_name}_{request.subarea_name}_{request.level_name}_{request.module_title}_{request.lesson_title}"
+    # Criar ID único (hash compacto) para a lição; o título fica em "title"
+    lesson_path = (
+        request.area_name, request.subarea_name, request.level_name, request.module_title, request.lesson_title
+    )
+    lesson_id = build_completion_id(*lesson_path)
 
-    # Verificar se já foi completada
+    # Verificar se já foi completada: após a migração a subcoleção (abaixo) basta;
+    # antes dela, os registros legados só existem no array (com o id legível)
     completed_lessons = current_user.get("completed_lessons", [])
-    if any(lesson.get("lesson_id") == lesson_id for lesson in completed_lessons):
+    lesson_ids = (lesson_id, build_legacy_completion_id(*lesson_path))
+    if not completions_migrated(current_user) and any(
+            lesson.get("lesson_id") in lesson_ids for lesson in completed_lessons
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Esta lição já foi completada anteriormente"
         )
 
     # Registrar conclusão
+    now = time.time()
+    today = date.fromtimestamp(now).isoformat()
     lesson_data = {
         "lesson_id": lesson_id,
         "title": request.lesson_title,
-        "completion_date": time.strftime("%Y-%m-%d"),
-        "timestamp": time.time(),
+        "completion_date": today,
+        "timestamp": now,
         "area": request.area_name or "",
         "subarea": request.subarea_name or "",
         "level": request.level_name or "",
         "module": request.module_title or ""
     }
 
-    # Adicionar à lista de lições completadas
-    user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "completed_lessons": ArrayUnion([lesson_data])
-    })
+    # Registro único na subcoleção: fecha a corrida entre conclusões simultâneas
+    if not await claim_completion_async(db, user_id, Collections.COMPLETED_LESSONS, lesson_id, lesson_data):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Esta lição já foi completada anteriormente"
+        )
 
-    # Adicionar XP
-    xp_earned = add_user_xp(db, user_id, XP_REWARDS.get("complete_lesson", 10),
-                            f"Completou lição: {request.lesson_title}")
+    # Adicionar à lista de lições completadas e XP
+    try:
+        xp_earned, _ = await apply_completion_writes(
+            db, user_id,
+            {
+                "completed_lessons": ArrayUnion([lesson_data]),
+                "stats.completed_lessons_count": Increment(1),
+                **build_daily_stats_update(today, lessons=1),
+                **build_study_streak_update(current_user, today),
+                "updated_at": SERVER_TIMESTAMP
+            },
+            XP_COMPLETE_LESSON,
+            f"Completou lição: {request.lesson_title}",
+            advance_step="lesson" if request.advance_progress else None
+        )
+    except HTTPException:
+        await release_completion_async(db, user_id, Collections.COMPLETED_LESSONS, lesson_id)
+        raise
 
     # PUBLICAR EVENTO DE LIÇÃO COMPLETADA
     await event_service.publish_event(
@@ -353,10 +797,8 @@ async def complete_lesson(
             }
         )
 
-    # Avançar progresso se aplicável
+    # Progresso já avançado no mesmo batch da conclusão
     if request.advance_progress:
-        advance_user_progress(db, user_id, "lesson")
-
         # PUBLICAR EVENTO DE PROGRESSO ATUALIZADO
         await event_service.publish_event(
             event_type=EventTypes.PROGRESS_UPDATED,
@@ -369,6 +811,8 @@ async def complete_lesson(
             }
         )
 
+    invalidate_progress_cache(user_id)
+
     return {
         "message": "Lesson completed successfully",
         "xp_earned": xp_earned["xp_added"],
@@ -387,39 +831,61 @@ async def complete_module(
     """
     user_id = current_user["id"]
 
-    # Criar ID único para o módulo
-    module_id = f"{request.area_name}_{request.subarea_name}_{request.level_name}_{request.module_title}"
+    # Criar ID único (hash compacto) para o módulo; o título fica em "title"
+    module_path = (request.area_name, request.subarea_name, request.level_name, request.module_title)
+    module_id = build_completion_id(*module_path)
 
-    # Verificar se já foi completado
+    # Verificar se já foi completado: após a migração a subcoleção (abaixo) basta;
+    # antes dela, os registros legados só existem no array (com o id legível)
     completed_modules = current_user.get("completed_modules", [])
-    if any(module.get("module_id") == module_id for module in completed_modules):
+    module_ids = (module_id, build_legacy_completion_id(*module_path))
+    if not completions_migrated(current_user) and any(
+            module.get("module_id") in module_ids for module in completed_modules
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Este módulo já foi completado anteriormente"
         )
 
     # Registrar conclusão
+    now = time.time()
+    today = date.fromtimestamp(now).isoformat()
     module_data = {
         "module_id": module_id,
         "title": request.module_title,
-        "completion_date": time.strftime("%Y-%m-%d"),
-        "timestamp": time.time(),
+        "completion_date": today,
+        "timestamp": now,
         "area": request.area_name or "",
         "subarea": request.subarea_name or "",
         "level": request.level_name or ""
     }
 
-    # Adicionar à lista de módulos completados
-    user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "completed_modules": ArrayUnion([module_data])
-    })
-
-    # Adicionar XP e badge
-    xp_earned = add_user_xp(db, user_id, XP_REWARDS.get("complete_module", 15),
-                            f"Completou módulo: {request.module_title}")
+    # Registro único na subcoleção: fecha a corrida entre conclusões simultâneas
+    if not await claim_completion_async(db, user_id, Collections.COMPLETED_MODULES, module_id, module_data):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Este módulo já foi completado anteriormente"
+        )
 
-    badge_granted = grant_badge(db, user_id, f"Módulo: {request.module_title[:20]}")
+    # Adicionar à lista de módulos completados, XP e badge
+    try:
+        xp_earned, badge_granted = await apply_completion_writes(
+            db, user_id,
+            {
+                "completed_modules": ArrayUnion([module_data]),
+                "stats.completed_modules_count": Increment(1),
+                **build_daily_stats_update(today, modules=1),
+                **build_study_streak_update(current_user, today),
+                "updated_at": SERVER_TIMESTAMP
+            },
+            XP_COMPLETE_MODULE,
+            f"Completou módulo: {request.module_title}",
+            badge_name=f"Módulo: {request.module_title[:20]}",
+            advance_step="module" if request.advance_progress else None
+        )
+    except HTTPException:
+        await release_completion_async(db, user_id, Collections.COMPLETED_MODULES, module_id)
+        raise
 
     # PUBLICAR EVENTO DE MÓDULO COMPLETADO
     await event_service.publish_event(
@@ -461,10 +927,8 @@ async def complete_module(
             }
         )
 
-    # Avançar progresso se aplicável
+    # Progresso já avançado no mesmo batch da conclusão
     if request.advance_progress:
-        advance_user_progress(db, user_id, "module")
-
         # PUBLICAR EVENTO DE PROGRESSO ATUALIZADO
         await event_service.publish_event(
             event_type=EventTypes.PROGRESS_UPDATED,
@@ -477,6 +941,8 @@ async def complete_module(
             }
         )
 
+    invalidate_progress_cache(user_id)
+
     return {
         "message": "Module completed successfully",
         "xp_earned": xp_earned["xp_added"],
@@ -496,33 +962,63 @@ async def complete_level(
     """
     user_id = current_user["id"]
 
+    # Criar ID único para o nível
+    level_id = f"{request.area_name}_{request.subarea_name}_{request.level_name}"
+
+    # Verificar se já foi completado (registros antigos não possuem level_id);
+    # após a migração a subcoleção (abaixo) basta
+    completed_levels = current_user.get("completed_levels", [])
+    if not completions_migrated(current_user) and any(
+            level.get("level_id") == level_id or (
+                    level.get("area") == request.area_name
+                    and level.get("subarea") == request.subarea_name
+                    and level.get("level") == request.level_name
+            )
+            for level in completed_levels
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Este nível já foi completado anteriormente"
+        )
+
     # Registrar conclusão
+    now = time.time()
     level_data = {
+        "level_id": level_id,
         "area": request.area_name,
         "subarea": request.subarea_name,
         "level": request.level_name,
-        "completion_date": time.strftime("%Y-%m-%d")
+        "completion_date": date.fromtimestamp(now).isoformat(),
+        "timestamp": now
     }
 
-    # Adicionar à lista de níveis completados
-    user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "completed_levels": ArrayUnion([level_data])
-    })
+    # Registro único na subcoleção: fecha a corrida entre conclusões simultâneas
+    if not await claim_completion_async(db, user_id, Collections.COMPLETED_LEVELS, level_id, level_data):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Este nível já foi completado anteriormente"
+        )
 
     # Calcular XP baseado no nível
-    xp_amount = 30
-    if request.level_name in ["avançado", "avancado"]:
-        xp_amount = 50
-    elif request.level_name in ["intermediário", "intermediario"]:
-        xp_amount = 40
+    xp_amount = LEVEL_XP_REWARDS.get(normalize_level_name(request.level_name), DEFAULT_LEVEL_XP)
 
-    # Adicionar XP e badge
-    xp_earned = add_user_xp(db, user_id, xp_amount,
-                            f"Completou nível {request.level_name} em {request.subarea_name}")
-
-    badge_granted = grant_badge(db, user_id,
-                                f"Nível {request.level_name.capitalize()}: {request.subarea_name}")
+    # Adicionar à lista de níveis completados, XP e badge
+    try:
+        xp_earned, badge_granted = await apply_completion_writes(
+            db, user_id,
+            {
+                "completed_levels": ArrayUnion([level_data]),
+                "stats.completed_levels_count": Increment(1),
+                "updated_at": SERVER_TIMESTAMP
+            },
+            xp_amount,
+            f"Completou nível {request.level_name} em {request.subarea_name}",
+            badge_name=f"Nível {request.level_name.capitalize()}: {request.subarea_name}",
+            advance_step="level" if request.advance_progress else None
+        )
+    except HTTPException:
+        await release_completion_async(db, user_id, Collections.COMPLETED_LEVELS, level_id)
+        raise
 
     # PUBLICAR EVENTO DE NÍVEL COMPLETADO
     await event_service.publish_event(
@@ -562,10 +1058,8 @@ async def complete_level(
             }
         )
 
-    # Avançar progresso se aplicável
+    # Progresso já avançado no mesmo batch da conclusão
     if request.advance_progress:
-        advance_user_progress(db, user_id, "level")
-
         # PUBLICAR EVENTO DE PROGRESSO ATUALIZADO
         await event_service.publish_event(
             event_type=EventTypes.PROGRESS_UPDATED,
@@ -578,6 +1072,8 @@ async def complete_level(
             }
         )
 
+    invalidate_progress_cache(user_id)
+
     return {
         "message": "Level completed successfully",
         "xp_earned": xp_earned["xp_added"],
@@ -598,26 +1094,32 @@ async def start_project(
     user_id = current_user["id"]
 
     # Estrutura do projeto iniciado
+    now = time.time()
+    today = date.fromtimestamp(now).isoformat()
     project_data = {
         "title": request.title,
         "type": request.project_type,
-        "start_date": time.strftime("%Y-%m-%d"),
+        "start_date": today,
+        "start_timestamp": now,
         "status": "in_progress",
         "description": request.description or ""
     }
 
-    # Adicionar à lista de projetos iniciados
-    user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "started_projects": ArrayUnion([project_data])
-    })
-
     # Adicionar XP por iniciar projeto
-    xp_amount = XP_REWARDS.get("start_project", 10)
-    if request.project_type == "final":
-        xp_amount = 15
+    xp_amount = XP_START_FINAL_PROJECT if request.project_type == "final" else XP_START_PROJECT
 
-    xp_earned = add_user_xp(db, user_id, xp_amount, f"Iniciou projeto: {request.title}")
+    # Adicionar à lista de projetos iniciados e XP
+    xp_earned, _ = await apply_completion_writes(
+        db, user_id,
+        {
+            "started_projects": ArrayUnion([project_data]),
+            "stats.active_projects_count": Increment(1),
+            **build_daily_stats_update(today, projects_started=1),
+            "updated_at": SERVER_TIMESTAMP
+        },
+        xp_amount,
+        f"Iniciou projeto: {request.title}"
+    )
 
     # PUBLICAR EVENTO DE PROJETO INICIADO
     await event_service.publish_event(
@@ -642,9 +1144,11 @@ async def start_project(
         }
     )
 
+    invalidate_progress_cache(user_id)
+
     return {
         "message": "Project started successfully",
-        "project_id": f"{user_id}_{int(time.time())}",
+        "project_id": f"{user_id}_{int(now)}",
         "xp_earned": xp_earned["xp_added"]
     }
 
@@ -659,46 +1163,34 @@ async def complete_project(
     Registra a conclusão de um projeto com lógica corrigida de atualização
     """
     user_id = current_user["id"]
-    user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
 
-    user_data = user_doc.to_dict()
-    started_projects = user_data.get("started_projects", [])
+    # Os projetos iniciados já vêm de get_current_user. Uma leitura levemente
+    # desatualizada é aceitável: a remoção usa ArrayRemove dos itens exatos, sem
+    # sobrescrever projetos iniciados em paralelo
+    started_projects = current_user.get("started_projects", [])
 
-    # Verificar se o projeto foi iniciado
-    project_found = False
-    for project in started_projects:
-        if project["title"] == request.title and project["type"] == request.project_type:
-            project_found = True
-            break
+    # Verificar se o projeto foi iniciado (uma única passada)
+    completed_entries = [
+        p for p in started_projects
+        if p["title"] == request.title and p["type"] == request.project_type
+    ]
 
-    if not project_found:
+    if not completed_entries:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Projeto não foi encontrado na lista de projetos iniciados"
         )
 
-    # Filtrar projetos iniciados para remover o que foi completado
-    updated_started_projects = [
-        p for p in started_projects
-        if not (p["title"] == request.title and p["type"] == request.project_type)
-    ]
-
-    # Estrutura do projeto concluído
+    # Estrutura do projeto concluído (uma única data evita divergência à meia-noite)
+    now = time.time()
+    today = date.fromtimestamp(now).isoformat()
     completed_project = {
         "title": request.title,
         "type": request.project_type,
-        "start_date": next((p["start_date"] for p in started_projects
-                            if p["title"] == request.title and p["type"] == request.project_type),
-                           time.strftime("%Y-%m-%d")),
-        "completion_date": time.strftime("%Y-%m-%d"),
-        "timestamp": time.time(),
+        "start_date": completed_entries[0].get("start_date", today),
+        "start_timestamp": completed_entries[0].get("start_timestamp"),
+        "completion_date": today,
+        "timestamp": now,
         "description": request.description or ""
     }
 
@@ -708,21 +1200,42 @@ async def complete_project(
     if request.evidence_urls:
         completed_project["evidence_urls"] = request.evidence_urls
 
-    # Atualizar no banco
-    user_ref.update({
-        "started_projects": updated_started_projects,
-        "completed_projects": ArrayUnion([completed_project])
-    })
-
     # Adicionar XP e possível badge
-    xp_amount = XP_REWARDS.get("complete_project", 25)
-    badge_granted = False
+    xp_amount = XP_COMPLETE_PROJECT
+    badge_name = None
 
     if request.project_type == "final":
-        xp_amount = XP_REWARDS.get("complete_final_project", 50)
-        badge_granted = grant_badge(db, user_id, f"Projeto Final: {request.title[:20]}")
+        xp_amount = XP_COMPLETE_FINAL_PROJECT
+        badge_name = f"Projeto Final: {request.title[:20]}"
+
+    # Registro único na subcoleção: duas conclusões simultâneas do mesmo
+    # projeto não contam em dobro
+    project_id = get_completion_id(Collections.COMPLETED_PROJECTS, completed_project)
+    if not await claim_completion_async(db, user_id, Collections.COMPLETED_PROJECTS, project_id, completed_project):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Projeto já foi concluído"
+        )
 
-    xp_earned = add_user_xp(db, user_id, xp_amount, f"Completou projeto: {request.title}")
+    # Atualizar no banco
+    try:
+        xp_earned, badge_granted = await apply_completion_writes(
+            db, user_id,
+            {
+                "started_projects": ArrayRemove(completed_entries),
+                "completed_projects": ArrayUnion([completed_project]),
+                "stats.completed_projects_count": Increment(1),
+                "stats.active_projects_count": Increment(-len(completed_entries)),
+                **build_daily_stats_update(today, projects_completed=1),
+                "updated_at": SERVER_TIMESTAMP
+            },
+            xp_amount,
+            f"Completou projeto: {request.title}",
+            badge_name=badge_name
+        )
+    except HTTPException:
+        await release_completion_async(db, user_id, Collections.COMPLETED_PROJECTS, project_id)
+        raise
 
     # PUBLICAR EVENTO DE PROJETO COMPLETADO
     await event_service.publish_event(
@@ -735,8 +1248,9 @@ async def complete_project(
             "evidence_urls": request.evidence_urls,
             "xp_earned": xp_earned["xp_added"],
             "badge_earned": badge_granted,
-            "duration_days": (time.time() - time.mktime(time.strptime(completed_project["start_date"], "%Y-%m-%d"))) / (
-                        24 * 60 * 60)
+            "duration_days": (
+                now - (completed_project["start_timestamp"] or date_to_timestamp(completed_project["start_date"]))
+            ) / (24 * 60 * 60)
         }
     )
 
@@ -763,6 +1277,8 @@ async def complete_project(
             }
         )
 
+    invalidate_progress_cache(user_id)
+
     return {
         "message": "Project completed successfully",
         "xp_earned": xp_earned["xp_added"],
@@ -813,7 +1329,8 @@ async def complete_assessment(
         if score >= 70:
             xp_earned += 10
 
-        # Registrar no histórico
+        # Registrar no histórico (um único instante para todos os registros)
+        now = datetime.utcnow()
         assessment_record = {
             "user_id": user_id,
             "assessment_id": assessment_id,
@@ -828,19 +1345,21 @@ async def complete_assessment(
             "level": level_name,
             "module": module_title,
             "xp_earned": xp_earned,
-            "completed_at": datetime.utcnow()
+            "completed_at": now
         }
 
-        # Salvar no Firestore
-        doc_ref = db.collection("assessment_history").add(assessment_record)
+        # Histórico, XP e transação de XP gravados em um único batch
+        batch = db.batch()
+        history_ref = db.collection("assessment_history").document()
+        batch.set(history_ref, assessment_record)
 
-        # Atualizar XP do usuário diretamente
         new_total_xp = current_user.get("profile_xp", 0)
+        xp_log = None
 
         try:
-            # Buscar e atualizar usuário no Firestore
+            # Buscar XP atual do usuário no Firestore
             user_doc_ref = db.collection("users").document(user_id)
-            user_doc = user_doc_ref.get()
+            user_doc = await asyncio.to_thread(user_doc_ref.get, field_paths=["profile_xp", "profile_level"])
 
             if user_doc.exists:
                 current_data = user_doc.to_dict()
@@ -852,10 +1371,10 @@ async def complete_assessment(
                 new_level = (new_total_xp // 100) + 1
 
                 # Atualizar usuário
-                user_doc_ref.update({
-                    "profile_xp": new_total_xp,
+                batch.update(user_doc_ref, {
+                    "profile_xp": Increment(xp_earned),
                     "profile_level": new_level,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": now
                 })
 
                 # Registrar transação de XP
@@ -869,16 +1388,19 @@ async def complete_assessment(
                     "new_level": new_level,
                     "assessment_id": assessment_id,
                     "score": score,
-                    "created_at": datetime.utcnow()
+                    "created_at": now
                 }
-                db.collection("xp_transactions").add(xp_transaction)
-
-                logger.info(f"XP atualizado para usuário {user_id}: {current_xp} -> {new_total_xp}")
+                batch.set(db.collection("xp_transactions").document(), xp_transaction)
+                xp_log = f"XP atualizado para usuário {user_id}: {current_xp} -> {new_total_xp}"
 
         except Exception as e:
             logger.error(f"Erro ao atualizar XP: {str(e)}")
             # Continuar sem falhar - pelo menos salvamos o histórico da avaliação
 
+        await asyncio.to_thread(batch.commit)
+        if xp_log:
+            logger.info(xp_log)
+
         # Publicar evento para processamento assíncrono
         try:
             await event_service.publish_event(
@@ -910,7 +1432,7 @@ async def complete_assessment(
             "xp_earned": xp_earned,
             "total_xp": new_total_xp,
             "message": "Avaliação registrada com sucesso!",
-            "assessment_record_id": doc_ref[1].id if doc_ref else None
+            "assessment_record_id": history_ref.id
         }
 
     except Exception as e:
@@ -920,13 +1442,12 @@ async def complete_assessment(
 @router.post("/advance")
 async def advance_progress(
         step_type: str = Query(..., description="Type of step to advance: lesson, module, level"),
-        current_user: dict = Depends(get_current_user),
+        user_id: str = Depends(get_current_user_id_required),
         db=Depends(get_db)
 ) -> Any:
     """
     Avança o progresso do usuário para o próximo passo
     """
-    user_id = current_user["id"]
 
     if step_type not in ["lesson", "module", "level"]:
         raise HTTPException(
@@ -934,7 +1455,7 @@ async def advance_progress(
             detail="Invalid step type. Must be: lesson, module, or level"
         )
 
-    result = advance_user_progress(db, user_id, step_type)
+    result = await advance_user_progress_async(db, user_id, step_type)
 
     if not result:
         raise HTTPException(
@@ -942,6 +1463,8 @@ async def advance_progress(
             detail="Unable to advance progress"
         )
 
+    invalidate_progress_cache(user_id)
+
     # PUBLICAR EVENTO DE AVANÇO DE PASSO
     await event_service.publish_event(
         event_type=EventTypes.STEP_ADVANCED,
@@ -982,13 +1505,12 @@ async def get_next_steps_recommendations(
     level = current.get("level", "iniciante")
 
     # Buscar dados da área atual
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-    area_doc = area_ref.get()
+    area_index = await asyncio.to_thread(get_area_data, db, area)
 
-    if not area_doc.exists:
+    if area_index is None:
         return {"recommendations": ["Continue seus estudos atuais"]}
 
-    area_data = area_doc.to_dict()
+    area_data = area_index["data"]
 
     # 1. Recomendação baseada em progresso
     module_idx = current.get("module_index", 0)
@@ -1014,12 +1536,9 @@ async def get_next_steps_recommendations(
                 recommendations.append(f"Parabéns! Você está próximo de completar o nível {level}")
 
                 # Sugerir próximo nível
-                levels_order = ["iniciante", "intermediário", "avançado"]
-                if level in levels_order:
-                    current_idx = levels_order.index(level)
-                    if current_idx < len(levels_order) - 1:
-                        next_level = levels_order[current_idx + 1]
-                        recommendations.append(f"Prepare-se para avançar para o nível {next_level}")
+                next_level = get_next_level_in_order(level)
+                if next_level:
+                    recommendations.append(f"Prepare-se para avançar para o nível {next_level}")
     except (KeyError, IndexError):
         pass
 
@@ -1068,51 +1587,57 @@ async def get_next_steps_recommendations(
     return {"recommendations": recommendations[:5]}
 
 
-@router.get("/today")
+async def load_daily_stats_user(user_ref) -> Dict[str, Any]:
+    """
+    Lê os campos usados por /today e /weekly (contadores e sequência de estudo)
+    """
+    user_doc = await asyncio.to_thread(user_ref.get, field_paths=[
+        "stats",
+        "daily_stats",
+        "study_streak",
+        "last_study_date"
+    ])
+
+    if not user_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    return user_doc.to_dict()
+
+
+@router.get("/today", response_class=ORJSONResponse)
 async def get_today_progress(
-        current_user: dict = Depends(get_current_user),
+        user_id: str = Depends(get_current_user_id_required),
         db=Depends(get_db)
 ) -> Dict[str, Any]:
     """
     Obtém o progresso do dia atual
-    """
-    user_id = current_user["id"]
-    today = date.today()
-    today_str = today.strftime("%Y-%m-%d")
-
-    # Contar atividades de hoje
-    lessons_today = 0
-    modules_today = 0
-    projects_today = 0
-    xp_today = 0
-
-    # Verificar lições completadas hoje
-    for lesson in current_user.get("completed_lessons", []):
-        if lesson.get("completion_date") == today_str:
-            lessons_today += 1
 
-    # Verificar módulos completados hoje
-    for module in current_user.get("completed_modules", []):
-        if module.get("completion_date") == today_str:
-            modules_today += 1
+    Lê apenas os contadores diários (daily_stats), sem o histórico completo.
+    """
+    user_ref = db.collection(Collections.USERS).document(user_id)
+    user_data = await load_daily_stats_user(user_ref)
+    await asyncio.to_thread(ensure_progress_stats, db, user_ref, user_data)
 
-    # Verificar projetos iniciados/completados hoje
-    for project in current_user.get("started_projects", []):
-        if project.get("start_date") == today_str:
-            projects_today += 1
+    # Uma única leitura do relógio por requisição
+    today_str = date.today().isoformat()
+    today_stats = get_daily_stats(user_data, today_str)
 
-    for project in current_user.get("completed_projects", []):
-        if project.get("completion_date") == today_str:
-            projects_today += 1
+    # Contar atividades de hoje
+    lessons_today = today_stats["lessons"]
+    modules_today = today_stats["modules"]
+    projects_today = today_stats["projects_started"] + today_stats["projects_completed"]
 
-    # Estimar XP ganho hoje (simplificado)
-    xp_today = (lessons_today * 10) + (modules_today * 15) + (projects_today * 25)
+    # XP ganho hoje (somado em daily_stats a cada add_user_xp)
+    xp_today = today_stats["xp"]
 
     # Calcular tempo de estudo estimado
     estimated_time = (lessons_today * 30) + (modules_today * 45) + (projects_today * 60)
 
     # Verificar se está em sequência
-    streak = calculate_study_streak(current_user)
+    streak = get_stored_study_streak(user_data, today_str)
 
     return {
         "date": today_str,
@@ -1129,86 +1654,61 @@ async def get_today_progress(
     }
 
 
-@router.get("/weekly")
+@router.get("/weekly", response_class=ORJSONResponse)
 async def get_weekly_progress(
-        current_user: dict = Depends(get_current_user),
+        user_id: str = Depends(get_current_user_id_required),
         db=Depends(get_db)
 ) -> Dict[str, Any]:
     """
     Obtém o progresso semanal
+
+    Lê apenas os contadores diários (daily_stats) dos sete dias da semana.
     """
-    user_id = current_user["id"]
+    user_ref = db.collection(Collections.USERS).document(user_id)
+    user_data = await load_daily_stats_user(user_ref)
+    await asyncio.to_thread(ensure_progress_stats, db, user_ref, user_data)
 
     # Calcular início da semana (segunda-feira)
     today = date.today()
     start_of_week = today - timedelta(days=today.weekday())
     end_of_week = start_of_week + timedelta(days=6)
 
-    # Contadores semanais
+    # Contadores semanais e de cada dia, em uma única passada pelos sete dias
     weekly_lessons = 0
     weekly_modules = 0
     weekly_projects = 0
     weekly_xp = 0
     daily_activity = {}
+    active_days = 0
+    best_day = None
+    max_xp = 0
 
-    # Inicializar dias da semana
-    for i in range(7):
-        day = start_of_week + timedelta(days=i)
-        daily_activity[day.strftime("%Y-%m-%d")] = {
-            "lessons": 0,
-            "modules": 0,
-            "projects": 0,
-            "xp": 0
+    for offset in range(7):
+        day = (start_of_week + timedelta(days=offset)).isoformat()
+        day_stats = get_daily_stats(user_data, day)
+        lessons = day_stats["lessons"]
+        modules = day_stats["modules"]
+        projects = day_stats["projects_started"]
+        day_xp = day_stats["xp"]
+
+        daily_activity[day] = {
+            "lessons": lessons,
+            "modules": modules,
+            "projects": projects,
+            "xp": day_xp
         }
 
-    # Contar lições da semana
-    for lesson in current_user.get("completed_lessons", []):
-        completion_date = lesson.get("completion_date")
-        if completion_date:
-            try:
-                lesson_date = datetime.strptime(completion_date, "%Y-%m-%d").date()
-                if start_of_week <= lesson_date <= end_of_week:
-                    weekly_lessons += 1
-                    if completion_date in daily_activity:
-                        daily_activity[completion_date]["lessons"] += 1
-                        daily_activity[completion_date]["xp"] += 10
-            except:
-                pass
-
-    # Contar módulos da semana
-    for module in current_user.get("completed_modules", []):
-        completion_date = module.get("completion_date")
-        if completion_date:
-            try:
-                module_date = datetime.strptime(completion_date, "%Y-%m-%d").date()
-                if start_of_week <= module_date <= end_of_week:
-                    weekly_modules += 1
-                    if completion_date in daily_activity:
-                        daily_activity[completion_date]["modules"] += 1
-                        daily_activity[completion_date]["xp"] += 15
-            except:
-                pass
-
-    # Contar projetos da semana
-    for project in current_user.get("started_projects", []):
-        start_date = project.get("start_date")
-        if start_date:
-            try:
-                project_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-                if start_of_week <= project_date <= end_of_week:
-                    weekly_projects += 1
-                    if start_date in daily_activity:
-                        daily_activity[start_date]["projects"] += 1
-                        daily_activity[start_date]["xp"] += 10
-            except:
-                pass
-
-    # XP total da semana
-    weekly_xp = (weekly_lessons * 10) + (weekly_modules * 15) + (weekly_projects * 10)
-
-    # Calcular dias ativos
-    active_days = sum(1 for day_data in daily_activity.values()
-                      if day_data["lessons"] > 0 or day_data["modules"] > 0 or day_data["projects"] > 0)
+        weekly_lessons += lessons
+        weekly_modules += modules
+        weekly_projects += projects
+        weekly_xp += day_xp
+        if lessons or modules or projects:
+            active_days += 1
+
+        # Melhor dia da semana (o primeiro em caso de empate)
+        if day_xp > max_xp:
+            max_xp = day_xp
+            best_day = day
 
     # Meta semanal
     weekly_goal = {
@@ -1216,17 +1716,9 @@ async def get_weekly_progress(
         "completed": weekly_lessons
     }
 
-    # Melhor dia da semana
-    best_day = None
-    max_xp = 0
-    for day, data in daily_activity.items():
-        if data["xp"] > max_xp:
-            max_xp = data["xp"]
-            best_day = day
-
     return {
-        "week_start": start_of_week.strftime("%Y-%m-%d"),
-        "week_end": end_of_week.strftime("%Y-%m-%d"),
+        "week_start": start_of_week.isoformat(),
+        "week_end": end_of_week.isoformat(),
         "total_lessons": weekly_lessons,
         "total_modules": weekly_modules,
         "total_projects": weekly_projects,
@@ -1240,17 +1732,142 @@ async def get_weekly_progress(
     }
 
 
-@router.get("/area-subarea")
-async def get_progress_for_area_subarea(
-        area: str = Query(..., description="Area name"),
-        subarea: str = Query(..., description="Subarea name"),
+def ensure_progress_stats(db, user_ref, user_data: dict) -> Dict[str, Any]:
+    """
+    Garante que os contadores em "stats" existam, derivando-os dos arrays legados
+
+    Usuários anteriores aos contadores (ou a uma versão mais antiga de "stats")
+    recebem um backfill único; como os arrays contêm todas as conclusões, o
+    backfill sobrescreve eventuais Increment parciais.
+    A sequência de estudo (study_streak/last_study_date), strongest_area e
+    daily_stats são preenchidos em user_data. As conclusões dos arrays são copiadas para as
+    subcoleções antes de gravar a nova versão, para que completions_migrated só
+    seja verdadeiro com a cópia concluída.
+    """
+    stats = user_data.get("stats") or {}
+    stats_version = stats.get("version", 1 if stats.get("initialized") else 0)
+    if stats_version >= PROGRESS_STATS_VERSION:
+        return stats
+
+    legacy_doc = user_ref.get(
+        field_paths=list(STATS_COUNTERS.values()) + ["started_projects", "last_login", "track_scores", "xp_history"]
+    )
+    legacy_data = legacy_doc.to_dict() or {}
+
+    stats = {
+        counter: len(legacy_data.get(field, []))
+        for counter, field in STATS_COUNTERS.items()
+    }
+
+    # Projetos ativos: iniciados cujo título ainda não consta nos concluídos
+    completed_titles = {p.get("title") for p in legacy_data.get("completed_projects", [])}
+    stats["active_projects_count"] = sum(
+        1 for p in legacy_data.get("started_projects", [])
+        if p.get("title") not in completed_titles
+    )
+    stats["initialized"] = True
+    stats["version"] = PROGRESS_STATS_VERSION
+
+    # A sequência, a área mais forte e os contadores diários também são
+    # derivados uma única vez
+    derived_fields = {
+        "study_streak": calculate_study_streak(legacy_data),
+        "last_study_date": get_last_study_date(legacy_data),
+        "strongest_area": get_strongest_area(legacy_data.get("track_scores")),
+        "daily_stats": build_daily_stats(legacy_data)
+    }
+    user_data.update(derived_fields)
+
+    backfill_completions(db, user_ref.id, legacy_data)
+
+    user_ref.update({
+        **{f"stats.{counter}": value for counter, value in stats.items()},
+        **derived_fields,
+        "updated_at": SERVER_TIMESTAMP
+    })
+    invalidate_progress_cache(user_ref.id)
+    return stats
+
+
+@router.get("/statistics", response_model=ProgressStatistics, response_class=ORJSONResponse)
+async def get_progress_statistics(
+        request: Request,
+        response: Response,
+        user_id: str = Depends(get_current_user_id_required),
+        db=Depends(get_db)
+) -> Any:
+    """
+    Obtém estatísticas de progresso do usuário
+
+    Lê apenas os campos necessários do documento (contadores desnormalizados),
+    sem transferir o histórico completo de conclusões.
+    """
+    user_ref = db.collection(Collections.USERS).document(user_id)
+    user_doc = await asyncio.to_thread(user_ref.get, field_paths=[
+        "stats",
+        "last_login",
+        "study_streak",
+        "last_study_date",
+        "strongest_area",
+        "updated_at"
+    ])
+
+    if not user_doc.exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    user_data = user_doc.to_dict()
+
+    # A sequência exibida zera quando o dia vira sem estudo, sem mudar
+    # "updated_at"; a data de hoje na versão invalida cache e ETag a cada dia
+    today_str = date.today().isoformat()
+    version = f"{progress_cache_version(user_data)}:{today_str}"
+
+    not_modified = apply_progress_cache_headers(request, response, user_id, "statistics", version)
+    if not_modified is not None:
+        return not_modified
+
+    cache_key = progress_cache_key(user_id, "statistics", version)
+    cached = progress_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    stats = await asyncio.to_thread(ensure_progress_stats, db, user_ref, user_data)
+
+    # Tempo de estudo estimado
+    total_study_time = sum(stats.get(counter, 0) * minutes for counter, minutes in STUDY_MINUTES.items())
+
+    result = ProgressStatistics.model_construct(
+        completed_lessons=stats.get("completed_lessons_count", 0),
+        completed_modules=stats.get("completed_modules_count", 0),
+        completed_levels=stats.get("completed_levels_count", 0),
+        completed_projects=stats.get("completed_projects_count", 0),
+        active_projects=max(stats.get("active_projects_count", 0), 0),
+        certifications=stats.get("certifications_count", 0),
+        current_streak=get_stored_study_streak(user_data, today_str),
+        total_study_time_minutes=total_study_time,
+        strongest_area=user_data.get("strongest_area"),
+        last_activity=user_data.get("last_login")
+    )
+
+    progress_cache.set(cache_key, result)
+    return result
+
+
+@router.get("/area-subarea")
+async def get_progress_for_area_subarea(
+        area: str = Query(..., description="Area name"),
+        subarea: str = Query(..., description="Subarea name"),
         current_user: dict = Depends(get_current_user),
         db=Depends(get_db)
 ) -> Any:
     """
     Obtém progresso específico para uma combinação área/subárea
     """
-    user_id = current_user["id"]
+    # Lições completadas nesta área/subárea (mesma contagem em todos os casos)
+    completed_count = count_area_subarea(current_user.get("completed_lessons", []), area, subarea)
 
     # Verificar no progresso atual
     current_progress = current_user.get("progress", {})
@@ -1265,7 +1882,7 @@ async def get_progress_for_area_subarea(
             "module_index": current_progress["current"].get("module_index", 0),
             "lesson_index": current_progress["current"].get("lesson_index", 0),
             "step_index": current_progress["current"].get("step_index", 0),
-            "completed_lessons": count_completed_in_area_subarea(current_user, area, subarea)
+            "completed_lessons": completed_count
         }
 
     # Verificar no progresso salvo
@@ -1282,12 +1899,9 @@ async def get_progress_for_area_subarea(
                 "module_index": area_progress["current"].get("module_index", 0),
                 "lesson_index": area_progress["current"].get("lesson_index", 0),
                 "step_index": area_progress["current"].get("step_index", 0),
-                "completed_lessons": count_completed_in_area_subarea(current_user, area, subarea)
+                "completed_lessons": completed_count
             }
 
-    # Verificar se tem lições completadas nesta área/subárea
-    completed_count = count_completed_in_area_subarea(current_user, area, subarea)
-
     return {
         "has_progress": completed_count > 0,
         "is_current": False,
@@ -1301,18 +1915,15 @@ async def get_progress_for_area_subarea(
     }
 
 
-def count_completed_in_area_subarea(user_data: dict, area: str, subarea: str) -> int:
-    """Conta lições completadas em uma área/subárea específica"""
-    count = 0
-    for lesson in user_data.get("completed_lessons", []):
-        if lesson.get("area") == area and lesson.get("subarea") == subarea:
-            count += 1
-    return count
+def count_area_subarea(items: List[Dict[str, Any]], area: str, subarea: str) -> int:
+    """Conta registros (lições, módulos) de uma área/subárea específica"""
+    return sum(1 for item in items if item.get("area") == area and item.get("subarea") == subarea)
+
 
 @router.post("/switch-track")
 async def switch_learning_track(
         payload: TrackSwitchRequest,
-        current_user: dict = Depends(get_current_user),
+        current_user: dict = Depends(get_current_user_slim),
         db=Depends(get_db)
 ) -> Any:
     """
@@ -1331,19 +1942,22 @@ async def switch_learning_track(
             detail="Already in this track"
         )
 
-    # Verificar se a nova trilha existe
-    track_ref = db.collection(Collections.LEARNING_PATHS).document(new_track)
-    track_doc = track_ref.get()
+    # Verificar se a nova trilha existe (as leituras do XP rodam em paralelo)
+    track_index, (writes, xp_result, _) = await asyncio.gather(
+        asyncio.to_thread(get_area_data, db, new_track),
+        prepare_completion_writes(db, user_id, 5, f"Mudou para trilha: {new_track}")
+    )
 
-    if not track_doc.exists:
+    if track_index is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Track not found"
         )
 
-    # Salvar progresso atual
+    # Salvar progresso atual (apenas a entrada da trilha anterior é regravada)
     saved_progress = current_user.get("saved_progress", {})
-    if old_track and "progress" in current_user:
+    saved_progress_changed = bool(old_track) and "progress" in current_user
+    if saved_progress_changed:
         saved_progress[old_track] = current_user["progress"]
 
     # Restaurar ou criar novo progresso
@@ -1351,8 +1965,7 @@ async def switch_learning_track(
         new_progress = saved_progress[new_track]
     else:
         # Criar novo progresso
-        track_data = track_doc.to_dict()
-        subareas = list(track_data.get("subareas", {}).keys())
+        subareas = list(track_index["subareas"])
 
         new_progress = {
             "area": new_track,
@@ -1369,14 +1982,16 @@ async def switch_learning_track(
     # Atualizar usuário
     updates = {
         "current_track": new_track,
-        "progress": new_progress,
-        "saved_progress": saved_progress
+        "progress": new_progress
     }
+    if saved_progress_changed:
+        updates.update(build_saved_progress_update(old_track, current_user["progress"]))
 
-    db.collection(Collections.USERS).document(user_id).update(updates)
+    updates["updated_at"] = SERVER_TIMESTAMP
 
-    # Adicionar XP
-    xp_result = add_user_xp(db, user_id, 5, f"Mudou para trilha: {new_track}")
+    # Troca de trilha e XP gravados em um único batch
+    await commit_completion_writes(db, user_id, writes, updates)
+    invalidate_progress_cache(user_id)
 
     # PUBLICAR EVENTO DE SELEÇÃO DE TRILHA
     await event_service.publish_event(
@@ -1420,17 +2035,25 @@ async def start_specialization(
     """
     user_id = current_user["id"]
 
-    # Verificar se a especialização existe
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(request.area)
-    area_doc = area_ref.get()
+    # Verificar se a especialização existe (as leituras do XP e da badge rodam em paralelo)
+    badge_name = f"Iniciou: {request.specialization_name}"
+    area_index, (writes, xp_result, badge_earned) = await asyncio.gather(
+        asyncio.to_thread(get_area_data, db, request.area),
+        prepare_completion_writes(
+            db, user_id,
+            XP_START_SPECIALIZATION,
+            f"Iniciou especialização: {request.specialization_name}",
+            badge_name=badge_name
+        )
+    )
 
-    if not area_doc.exists:
+    if area_index is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Área '{request.area}' não encontrada"
         )
 
-    area_data = area_doc.to_dict()
+    area_data = area_index["data"]
     subareas = area_data.get("subareas", {})
 
     if request.subarea not in subareas:
@@ -1459,10 +2082,10 @@ async def start_specialization(
     prerequisites = spec_found.get("prerequisites", [])
     if prerequisites and request.force_start is False:
         completed_levels = current_user.get("completed_levels", [])
-        completed_level_names = [
+        completed_level_names = {
             f"{l.get('level', '')} em {l.get('subarea', '')}"
             for l in completed_levels
-        ]
+        }
 
         missing_prereqs = [p for p in prerequisites if p not in completed_level_names]
         if missing_prereqs:
@@ -1471,11 +2094,11 @@ async def start_specialization(
                 detail=f"Pré-requisitos faltando: {', '.join(missing_prereqs)}"
             )
 
-    # Verificar se já foi iniciada
-    specializations_started = current_user.get("specializations_started", [])
+    # Verificar se já foi iniciada: registros antigos só existem no array legado;
+    # os novos ficam na subcoleção (checada abaixo, ao registrar)
     already_started = any(
         s.get("name") == request.specialization_name
-        for s in specializations_started
+        for s in current_user.get("specializations_started", [])
     )
 
     if already_started:
@@ -1485,11 +2108,13 @@ async def start_specialization(
         )
 
     # Criar registro de especialização
+    now = time.time()
     spec_record = {
         "name": request.specialization_name,
         "area": request.area,
         "subarea": request.subarea,
-        "start_date": time.strftime("%Y-%m-%d"),
+        "start_date": date.fromtimestamp(now).isoformat(),
+        "start_timestamp": now,
         "estimated_duration": spec_found.get("estimated_time", ""),
         "modules_total": len(spec_found.get("modules", [])),
         "modules_completed": 0,
@@ -1497,21 +2122,20 @@ async def start_specialization(
         "status": "in_progress"
     }
 
-    # Adicionar ao banco
-    user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "specializations_started": ArrayUnion([spec_record])
-    })
-
-    # Adicionar XP e badge
-    xp_result = add_user_xp(
-        db, user_id,
-        XP_REWARDS.get("start_specialization", 20),
-        f"Iniciou especialização: {request.specialization_name}"
-    )
+    # Registro único na subcoleção (fora do documento do usuário)
+    spec_id = build_completion_id(request.area, request.subarea, request.specialization_name)
+    if not await claim_completion_async(db, user_id, Collections.SPECIALIZATIONS_STARTED, spec_id, spec_record):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Especialização já foi iniciada"
+        )
 
-    badge_name = f"Iniciou: {request.specialization_name}"
-    badge_earned = grant_badge(db, user_id, badge_name)
+    # XP e badge no mesmo batch
+    try:
+        await commit_completion_writes(db, user_id, writes, {"updated_at": SERVER_TIMESTAMP})
+    except HTTPException:
+        await release_completion_async(db, user_id, Collections.SPECIALIZATIONS_STARTED, spec_id)
+        raise
 
     # PUBLICAR EVENTO - Especialização iniciada
     await event_service.publish_event(
@@ -1539,17 +2163,16 @@ async def start_specialization(
     }
 
 
-@router.post("/navigate-to")
+@router.post("/navigate-to", response_class=ORJSONResponse)
 async def navigate_to_content(
         request: Dict[str, Any],
-        current_user: dict = Depends(get_current_user),
+        current_user: dict = Depends(get_current_user_slim),
         db=Depends(get_db)
 ) -> Any:
     """
     Navega diretamente para um conteúdo específico
     """
     user_id = current_user["id"]
-    user_ref = db.collection(Collections.USERS).document(user_id)
 
     # Extrair parâmetros do request body
     area = request.get("area")
@@ -1568,75 +2191,62 @@ async def navigate_to_content(
         )
 
     # Verificar se o conteúdo existe
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-    area_doc = area_ref.get()
+    area_index = await asyncio.to_thread(get_area_data, db, area)
 
-    if not area_doc.exists:
+    if area_index is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Área '{area}' não encontrada"
         )
 
-    area_data = area_doc.to_dict()
-
-    # Validar caminho completo
-    try:
-        subarea_data = area_data["subareas"][subarea]
-
-        if level == "especialização" and specialization:
-            # Lógica para especialização...
-            pass
-        else:
-            # IMPORTANTE: Verificar se o nível existe exatamente como está
-            if level not in subarea_data.get("levels", {}):
-                # Tentar encontrar o nível independente de acentuação
-                available_levels = list(subarea_data.get("levels", {}).keys())
-
-                # Procurar match case-insensitive
-                level_found = None
-                for available_level in available_levels:
-                    if available_level.lower() == level.lower():
-                        level_found = available_level
-                        break
-
-                if not level_found:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Nível '{level}' não encontrado. Níveis disponíveis: {available_levels}"
-                    )
-
-                # Usar o nível encontrado
-                level = level_found
+    # Validar caminho completo com buscas no índice da área (sem exceções)
+    if subarea not in area_index["subarea_index"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Caminho inválido: '{subarea}'"
+        )
 
-            level_data = subarea_data["levels"][level]
-            modules = level_data.get("modules", [])
+    if not (level == "especialização" and specialization):
+        # IMPORTANTE: Verificar se o nível existe exatamente como está
+        if (subarea, level) not in area_index["sizes"]:
+            # Procurar match case-insensitive no índice da área
+            level_found = area_index["levels_ci"][subarea].get(level.lower())
 
-            if module_index >= len(modules):
+            if not level_found:
+                available_levels = list(area_index["levels_ci"][subarea].values())
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Índice de módulo inválido: {module_index}"
+                    detail=f"Nível '{level}' não encontrado. Níveis disponíveis: {available_levels}"
                 )
 
-    except KeyError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Caminho inválido: {str(e)}"
-        )
+            # Usar o nível encontrado
+            level = level_found
+
+        if (subarea, level, module_index) not in area_index["modules"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Índice de módulo inválido: {module_index}"
+            )
 
     # Buscar progresso atual
     current_progress = current_user.get("progress", {})
     old_progress = current_progress.copy()
 
+    # Atualizações do usuário, gravadas junto com o XP em um único batch
+    updates = {"updated_at": SERVER_TIMESTAMP}
+
     # Preservar progresso anterior se mudando de área
     if current_progress.get("area") != area and current_progress.get("area"):
-        saved_progress = current_user.get("saved_progress", {})
-        saved_progress[current_progress["area"]] = current_progress.copy()
-        user_ref.update({"saved_progress": saved_progress})
+        updates.update(build_saved_progress_update(current_progress["area"], current_progress))
 
     # Criar estrutura de progresso atualizada
     updated_progress = {
         "area": area,
-        "subareas_order": current_progress.get("subareas_order", list(area_data.get("subareas", {}).keys())),
+        "subareas_order": (
+            current_progress["subareas_order"]
+            if current_progress.get("area") == area and "subareas_order" in current_progress
+            else list(area_index["subareas"])
+        ),
         "current": {
             "subarea": subarea,
             "level": level,
@@ -1646,14 +2256,13 @@ async def navigate_to_content(
         }
     }
 
-    # Atualizar no banco
-    user_ref.update({
-        "progress": updated_progress,
-        "current_track": area
-    })
-
-    # Adicionar XP por navegação
-    xp_result = add_user_xp(db, user_id, 2, f"Navegou para: {level} - Módulo {module_index + 1}")
+    # Atualizar no banco, com o XP por navegação
+    updates["progress"] = updated_progress
+    updates["current_track"] = area
+    xp_result, _ = await apply_completion_writes(
+        db, user_id, updates, 2, f"Navegou para: {level} - Módulo {module_index + 1}"
+    )
+    invalidate_progress_cache(user_id)
 
     # PUBLICAR EVENTO DE NAVEGAÇÃO
     await event_service.publish_event(
@@ -1689,7 +2298,7 @@ async def navigate_to_content(
 @router.post("/initialize")
 async def initialize_progress(
         request: InitializeProgressRequest,
-        current_user: dict = Depends(get_current_user),
+        current_user: dict = Depends(get_current_user_slim),
         db=Depends(get_db)
 ) -> Any:
     """
@@ -1698,16 +2307,15 @@ async def initialize_progress(
     user_id = current_user["id"]
 
     # Validar que a área/subárea existe
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(request.area)
-    area_doc = area_ref.get()
+    area_index = await asyncio.to_thread(get_area_data, db, request.area)
 
-    if not area_doc.exists:
+    if area_index is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Área '{request.area}' não encontrada"
         )
 
-    area_data = area_doc.to_dict()
+    area_data = area_index["data"]
     subareas = area_data.get("subareas", {})
 
     if request.subarea not in subareas:
@@ -1742,7 +2350,7 @@ async def initialize_progress(
     # Criar novo progresso
     new_progress = {
         "area": request.area,
-        "subareas_order": list(subareas.keys()),
+        "subareas_order": list(area_index["subareas"]),
         "current": {
             "subarea": request.subarea,
             "level": request.level,
@@ -1755,20 +2363,26 @@ async def initialize_progress(
 
     # Se quiser tornar esta a área atual
     if request.set_as_current:
-        # Salvar progresso atual se existir
-        if current_progress and current_progress.get("area"):
-            saved_progress[current_progress["area"]] = current_progress
-
-        # Atualizar progresso atual
-        user_ref = db.collection(Collections.USERS).document(user_id)
-        user_ref.update({
+        updates = {
             "progress": new_progress,
             "current_track": request.area,
-            "saved_progress": saved_progress
-        })
+            "updated_at": SERVER_TIMESTAMP
+        }
 
-        # Adicionar XP
-        xp_result = add_user_xp(db, user_id, 5, f"Iniciou estudos em: {request.subarea}")
+        # Salvar progresso da área anterior; na mesma área o progresso salvo seria
+        # sobrescrito na próxima troca de trilha, então não é regravado
+        if current_progress and current_progress.get("area") not in (None, request.area):
+            saved_progress[current_progress["area"]] = current_progress
+            updates.update(build_saved_progress_update(current_progress["area"], current_progress))
+
+        # Atualizar progresso atual e adicionar XP em um único batch
+        xp_result, _ = await apply_completion_writes(
+            db, user_id,
+            updates,
+            5,
+            f"Iniciou estudos em: {request.subarea}"
+        )
+        invalidate_progress_cache(user_id)
 
         # PUBLICAR EVENTO DE PROGRESSO INICIALIZADO
         await event_service.publish_event(
@@ -1794,9 +2408,11 @@ async def initialize_progress(
         saved_progress[request.area] = new_progress
 
         user_ref = db.collection(Collections.USERS).document(user_id)
-        user_ref.update({
-            "saved_progress": saved_progress
+        await asyncio.to_thread(user_ref.update, {
+            **build_saved_progress_update(request.area, new_progress),
+            "updated_at": SERVER_TIMESTAMP
         })
+        invalidate_progress_cache(user_id)
 
         # PUBLICAR EVENTO DE PROGRESSO INICIALIZADO
         await event_service.publish_event(
@@ -1818,19 +2434,375 @@ async def initialize_progress(
         }
 
 
-@router.get("/current-content")
+def generate_step_content(
+        step_content: Any,
+        area: str,
+        subarea: str,
+        level: str,
+        user_age: int,
+        teaching_style: str,
+        on_delta: Optional[Callable[[str], None]] = None
+) -> Tuple[str, bool]:
+    """
+    Gera a explicação expandida de um passo
+
+    Args:
+        on_delta: Recebe os trechos do texto à medida que o LLM os produz
+
+    Returns:
+        Tupla (conteúdo, cacheável); respostas de erro do LLM não são cacheáveis
+    """
+    content = call_teacher_llm(
+        f"Explique de forma didática para um estudante de {user_age} anos: {step_content}. "
+        f"Contexto: Área: {area}, Subárea: {subarea}, Nível: {level}. "
+        f"Use exemplos práticos e linguagem acessível.",
+        student_age=user_age,
+        subject_area=area,
+        teaching_style=teaching_style,
+        on_delta=on_delta
+    )
+    return content, bool(content) and not content.startswith(LLM_ERROR_PREFIX)
+
+
+def generate_lesson_content(
+        lesson_title: str,
+        area: str,
+        subarea: str,
+        level: str,
+        user_age: int,
+        teaching_style: str,
+        on_delta: Optional[Callable[[str], None]] = None
+) -> Tuple[str, bool]:
+    """
+    Gera uma lição completa para lições sem passos
+
+    A lição é gerada como JSON estruturado, então não há trechos parciais a
+    repassar: on_delta é aceito apenas pela interface de run_content_job e o
+    texto chega inteiro ao final do job.
+
+    Returns:
+        Tupla (conteúdo, cacheável); lições de fallback não são cacheáveis
+    """
+    lesson = generate_complete_lesson(
+        topic=lesson_title,
+        subject_area=f"{area} - {subarea}",
+        age_range=user_age,
+        knowledge_level=level,
+        teaching_style=teaching_style,
+        lesson_duration_min=30
+    )
+    return lesson.to_text(), not lesson.is_fallback
+
+
+async def schedule_content_job(
+        background_tasks: BackgroundTasks,
+        db,
+        content_key: str,
+        generator,
+        metadata: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Agenda a geração do conteúdo em segundo plano (se ainda não houver job ativo)
+
+    Returns:
+        Campos de status a incluir na resposta para o cliente consultar o job
+    """
+    if await asyncio.to_thread(claim_content_job, db, content_key):
+        background_tasks.add_task(run_content_job, db, content_key, generator, metadata)
+
+    return {
+        "content_status": "pending",
+        "job_id": content_key,
+        "poll_url": f"{settings.api_v1_str}/progress/content/{content_key}",
+        "stream_url": f"{settings.api_v1_str}/progress/content/{content_key}/stream"
+    }
+
+
+def find_next_content_position(
+        area_index: dict,
+        subarea: str,
+        level: str,
+        module_idx: int,
+        lesson_idx: int,
+        step_idx: int
+) -> Optional[Tuple[int, int, int]]:
+    """
+    Obtém a posição do conteúdo seguinte no nível: próximo passo, primeira
+    posição da próxima lição ou do próximo módulo
+
+    Returns:
+        Tupla (module_idx, lesson_idx, step_idx) ou None no fim do nível
+    """
+    sizes = area_index["sizes"]
+
+    if step_idx + 1 < sizes.get((subarea, level, module_idx, lesson_idx), 0):
+        return module_idx, lesson_idx, step_idx + 1
+
+    if lesson_idx + 1 < sizes.get((subarea, level, module_idx), 0):
+        return module_idx, lesson_idx + 1, 0
+
+    if module_idx + 1 < sizes.get((subarea, level), 0) and sizes.get((subarea, level, module_idx + 1), 0):
+        return module_idx + 1, 0, 0
+
+    return None
+
+
+async def prefetch_next_content(
+        background_tasks: BackgroundTasks,
+        db,
+        area_index: dict,
+        area: str,
+        subarea: str,
+        level: str,
+        position: Tuple[int, int, int],
+        user_age: Any,
+        teaching_style: str
+):
+    """
+    Agenda especulativamente a geração do conteúdo seguinte ao atual
+
+    Os estudantes avançam quase sempre em sequência, então a próxima requisição
+    encontra o conteúdo no cache. A geração só é agendada em cache miss, se
+    houver vaga (acquire_prefetch_slot) e nenhum job ativo para a mesma chave.
+    """
+    next_position = find_next_content_position(area_index, subarea, level, *position)
+    if next_position is None:
+        return
+
+    module_idx, lesson_idx, step_idx = next_position
+    lesson_key = (subarea, level, module_idx, lesson_idx)
+    step_content = area_index["steps"].get(lesson_key + (step_idx,))
+
+    if step_content is not None:
+        content_key = build_content_cache_key(
+            area, subarea, level, module_idx, lesson_idx, step_idx, user_age, teaching_style,
+            str(step_content)
+        )
+        generator = partial(generate_step_content, step_content, area, subarea, level, user_age, teaching_style)
+    else:
+        # Lição sem passos: o conteúdo é a lição completa
+        lesson_title = area_index["lessons"][lesson_key].get("lesson_title", f"Lição {lesson_idx + 1}")
+        step_idx = None
+        content_key = build_content_cache_key(
+            area, subarea, level, module_idx, lesson_idx, None, user_age, teaching_style,
+            lesson_title
+        )
+        generator = partial(generate_lesson_content, lesson_title, area, subarea, level, user_age, teaching_style)
+
+    if await asyncio.to_thread(get_cached_content, db, content_key) is not None:
+        return
+
+    if not acquire_prefetch_slot():
+        return
+
+    if not await asyncio.to_thread(claim_content_job, db, content_key):
+        release_prefetch_slot()
+        return
+
+    background_tasks.add_task(run_prefetch_job, db, content_key, generator, {
+        "area": area,
+        "subarea": subarea,
+        "level": level,
+        "module_index": module_idx,
+        "lesson_index": lesson_idx,
+        "step_index": step_idx,
+        "age_bucket": get_age_bucket(user_age),
+        "teaching_style": teaching_style,
+        "prefetched": True
+    })
+
+
+@router.get("/content/{job_id}")
+async def get_content_job_status(
+        job_id: str,
+        response: Response,
+        user_id: str = Depends(get_current_user_id_required),
+        db=Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Consulta o resultado de um job de geração de conteúdo iniciado em /current-content
+    """
+    content = await asyncio.to_thread(get_cached_content, db, job_id)
+    if content is not None:
+        return {"job_id": job_id, "status": "ready", "content": content}
+
+    job = await asyncio.to_thread(get_content_job, db, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de conteúdo não encontrado"
+        )
+
+    if job.get("status") == "failed":
+        return {
+            "job_id": job_id,
+            "status": "failed",
+            "content": job.get("content") or f"{LLM_ERROR_PREFIX} Tente novamente mais tarde."
+        }
+
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {"job_id": job_id, "status": "pending", "content": None}
+
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Formata um evento Server-Sent Events com dados em JSON"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def content_job_events(db, job_id: str):
+    """
+    Gera os eventos SSE de um job de conteúdo até sua conclusão
+
+    Enquanto o job é gerado neste processo, cada trecho do LLM é enviado como
+    evento "delta". Depois (ou se o job roda em outro worker), o estado
+    persistido é consultado até o evento final: "ready" com o conteúdo
+    completo ou "failed".
+    """
+    sent = 0
+    deadline = time.monotonic() + CONTENT_JOB_TIMEOUT
+
+    while time.monotonic() < deadline:
+        stream = get_content_stream(job_id)
+        if stream is not None:
+            while True:
+                done = stream.done
+                chunks = stream.chunks[sent:]
+                for chunk in chunks:
+                    yield format_sse_event("delta", {"delta": chunk})
+                sent += len(chunks)
+
+                if done:
+                    break
+                await asyncio.sleep(CONTENT_STREAM_INTERVAL)
+
+        content = await asyncio.to_thread(get_cached_content, db, job_id)
+        if content is not None:
+            yield format_sse_event("ready", {"job_id": job_id, "status": "ready", "content": content})
+            return
+
+        job = await asyncio.to_thread(get_content_job, db, job_id)
+        if job is None or job.get("status") == "failed":
+            yield format_sse_event("failed", {
+                "job_id": job_id,
+                "status": "failed",
+                "content": (job or {}).get("content") or f"{LLM_ERROR_PREFIX} Tente novamente mais tarde."
+            })
+            return
+
+        if stream is None:
+            await asyncio.sleep(CONTENT_JOB_POLL_INTERVAL)
+
+    yield format_sse_event("failed", {
+        "job_id": job_id,
+        "status": "failed",
+        "content": f"{LLM_ERROR_PREFIX} Tente novamente mais tarde."
+    })
+
+
+@router.get("/content/{job_id}/stream")
+async def stream_content_job(
+        job_id: str,
+        user_id: str = Depends(get_current_user_id_required),
+        db=Depends(get_db)
+) -> StreamingResponse:
+    """
+    Transmite via Server-Sent Events o conteúdo de um job iniciado em
+    /current-content, à medida que é gerado (alternativa a /content/{job_id})
+    """
+    if get_content_stream(job_id) is None:
+        job, content = await asyncio.gather(
+            asyncio.to_thread(get_content_job, db, job_id),
+            asyncio.to_thread(get_cached_content, db, job_id)
+        )
+        if job is None and content is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job de conteúdo não encontrado"
+            )
+
+    return StreamingResponse(
+        content_job_events(db, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Execuções em andamento de /current-content, por usuário e posição
+_current_content_inflight: Dict[Tuple[Any, ...], asyncio.Future] = {}
+
+
+@router.get("/current-content", response_class=ORJSONResponse)
 async def get_current_content(
-        current_user: dict = Depends(get_current_user),
+        request: Request,
+        response: Response,
+        background_tasks: BackgroundTasks,
+        current_user: dict = Depends(get_current_user_slim),
         db=Depends(get_db)
 ) -> Any:
     """
     Obtém o conteúdo atual baseado no progresso do usuário
     SEMPRE retorna contexto completo de navegação
+
+    Se o conteúdo gerado ainda não estiver em cache, a geração é agendada em
+    segundo plano e a resposta (202) traz job_id/poll_url em vez do conteúdo;
+    stream_url transmite o texto via SSE à medida que é gerado.
+
+    Requisições simultâneas do mesmo usuário na mesma posição (recarregamentos,
+    cliques duplos) aguardam a execução já em andamento em vez de repeti-la.
+
+    A resposta contém apenas tipos que o orjson serializa diretamente, então é
+    devolvida como ORJSONResponse sem passar pelo jsonable_encoder, com ETag
+    do corpo (build_current_content_response).
+    """
+    progress = current_user.get("progress", {})
+    current = progress.get("current", {})
+    inflight_key = (
+        current_user["id"],
+        progress.get("area"),
+        current.get("subarea"),
+        current.get("level"),
+        current.get("module_index"),
+        current.get("lesson_index"),
+        current.get("step_index")
+    )
+
+    inflight = _current_content_inflight.get(inflight_key)
+    if inflight is not None:
+        content, status_code = await asyncio.shield(inflight)
+        return build_current_content_response(request, content, status_code or status.HTTP_200_OK)
+
+    future = asyncio.get_running_loop().create_future()
+    _current_content_inflight[inflight_key] = future
+    try:
+        content = await load_current_content(response, background_tasks, current_user, db)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Evita o aviso de exceção não recuperada quando não há outras requisições
+        future.exception()
+        raise
+    else:
+        future.set_result((content, response.status_code))
+        return build_current_content_response(request, content, response.status_code or status.HTTP_200_OK)
+    finally:
+        _current_content_inflight.pop(inflight_key, None)
+
+
+async def load_current_content(
+        response: Response,
+        background_tasks: BackgroundTasks,
+        current_user: dict,
+        db
+) -> Any:
+    """
+    Monta a resposta de /current-content (ver get_current_content)
     """
     user_id = current_user["id"]
 
-    # Garantir contexto válido
-    nav_context = ensure_navigation_context(current_user, db)
+    # Garantir contexto válido e buscar o currículo da área indexado por posição
+    nav_context, area_index = await load_navigation_context(current_user, db)
     area = nav_context["area"]
     subarea = nav_context["subarea"]
     level = nav_context["level"]
@@ -1838,11 +2810,7 @@ async def get_current_content(
     lesson_idx = nav_context["lesson_index"]
     step_idx = nav_context["step_index"]
 
-    # Buscar dados da área
-    area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-    area_doc = area_ref.get()
-
-    if not area_doc.exists:
+    if area_index is None:
         # Mesmo sem área, retornar contexto válido
         return {
             "content_type": "no_content",
@@ -1864,14 +2832,18 @@ async def get_current_content(
             }
         }
 
-    area_data = area_doc.to_dict()
+    area_data = area_index["data"]
+    sizes = area_index["sizes"]
 
     try:
         # Verificar se subárea existe
         if subarea not in area_data.get("subareas", {}):
-            # Pegar primeira subárea disponível
-            available_subareas = list(area_data.get("subareas", {}).keys())
-            if available_subareas:
+            # Procurar match case-insensitive; senão, pegar a primeira subárea disponível
+            available_subareas = area_index["subareas"]
+            subarea_found = area_index["subareas_ci"].get((subarea or "").lower())
+            if subarea_found:
+                subarea = subarea_found
+            elif available_subareas:
                 subarea = available_subareas[0]
             else:
                 return {
@@ -1888,7 +2860,10 @@ async def get_current_content(
         # Verificar se nível existe
         if level not in subarea_data.get("levels", {}):
             available_levels = list(subarea_data.get("levels", {}).keys())
-            if available_levels:
+            level_found = area_index["levels_ci"][subarea].get((level or "").lower())
+            if level_found:
+                level = level_found
+            elif available_levels:
                 level = available_levels[0]
             else:
                 return {
@@ -1900,11 +2875,14 @@ async def get_current_content(
                     "navigation_context": nav_context
                 }
 
-        level_data = subarea_data["levels"][level]
-        modules = level_data.get("modules", [])
+        # nav_context é o contexto devolvido em todas as respostas abaixo
+        nav_context["subarea"] = subarea
+        nav_context["level"] = level
+
+        module_count = sizes.get((subarea, level), 0)
 
         # Se não há módulos
-        if not modules:
+        if not module_count:
             return {
                 "content_type": "no_modules",
                 "message": "Nenhum módulo disponível neste nível",
@@ -1912,12 +2890,75 @@ async def get_current_content(
                 "current_subarea": subarea,
                 "current_level": level,
                 "navigation_context": nav_context,
-                "next_content": get_next_available_content(area_data, nav_context, db)
+                "next_content": await asyncio.to_thread(get_next_available_content, area_index, nav_context, db)
             }
 
+        # Avançar além de lições/módulos esgotados de uma vez (sem reentrar no endpoint)
+        new_module_idx, new_lesson_idx, new_step_idx, completed = normalize_content_position(
+            area_index, subarea, level, module_idx, lesson_idx, step_idx
+        )
+        if (new_module_idx, new_lesson_idx, new_step_idx) != (module_idx, lesson_idx, step_idx):
+            module_idx, lesson_idx, step_idx = new_module_idx, new_lesson_idx, new_step_idx
+
+            # A posição só é gravada se apontar para um conteúdo (no fim do nível,
+            # o usuário segue pelo next_content)
+            position_written = True
+            if module_idx < module_count:
+                # Transação: não sobrescreve uma navegação concorrente
+                stored_current = current_user.get("progress", {}).get("current", {})
+                position_written = await asyncio.to_thread(
+                    update_position_if_unchanged, db, user_id,
+                    {field: stored_current.get(field) for field in POSITION_FIELDS},
+                    {
+                        "progress.current.module_index": module_idx,
+                        "progress.current.lesson_index": lesson_idx,
+                        "progress.current.step_index": step_idx,
+                        **build_progress_percentage_update(area_index, area, subarea, level, module_idx, lesson_idx),
+                        "updated_at": SERVER_TIMESTAMP
+                    }
+                )
+                if position_written:
+                    invalidate_progress_cache(user_id)
+
+                nav_context["module_index"] = module_idx
+                nav_context["lesson_index"] = lesson_idx
+                nav_context["step_index"] = step_idx
+
+            # PUBLICAR EVENTOS DE MÓDULOS/LIÇÕES COMPLETADOS (só quem gravou o avanço)
+            for position in (completed if position_written else ()):
+                completed_module = area_index["modules"][(subarea, level, position[0])]
+                module_title = completed_module.get("module_title", f"Módulo {position[0] + 1}")
+
+                if len(position) == 1:
+                    await event_service.publish_event(
+                        event_type=EventTypes.MODULE_COMPLETED,
+                        user_id=user_id,
+                        data={
+                            "module_title": module_title,
+                            "area": area,
+                            "subarea": subarea,
+                            "level": level,
+                            "auto_detected": True
+                        }
+                    )
+                else:
+                    completed_lesson = area_index["lessons"][(subarea, level) + position]
+                    await event_service.publish_event(
+                        event_type=EventTypes.LESSON_COMPLETED,
+                        user_id=user_id,
+                        data={
+                            "lesson_title": completed_lesson.get("lesson_title", f"Lição {position[1] + 1}"),
+                            "area": area,
+                            "subarea": subarea,
+                            "level": level,
+                            "module": module_title,
+                            "auto_detected": True
+                        }
+                    )
+
         # Verificar se ultrapassou todos os módulos
-        if module_idx >= len(modules):
-            next_content = get_next_available_content(area_data, nav_context, db)
+        if module_idx >= module_count:
+            next_content = await asyncio.to_thread(get_next_available_content, area_index, nav_context, db)
 
             # PUBLICAR EVENTO DE NÍVEL COMPLETADO
             await event_service.publish_event(
@@ -1942,24 +2983,27 @@ async def get_current_content(
                     "area": area,
                     "subarea": subarea,
                     "level": level,
-                    "module_index": len(modules) - 1,
+                    "module_index": module_count - 1,
                     "lesson_index": 0,
                     "step_index": 0
                 },
                 "completed": True,
                 "next_content": next_content,
                 "achievements": {
-                    "modules_completed": len(modules),
+                    "modules_completed": module_count,
                     "level_completed": True
                 }
             }
 
         # Processar módulo atual
-        module_data = modules[module_idx]
-        lessons = module_data.get("lessons", [])
+        module_data = area_index["modules"].get((subarea, level, module_idx))
+        if module_data is None:
+            raise ValueError(f"Módulo inválido: {module_idx}")
+
+        lesson_count = sizes[(subarea, level, module_idx)]
 
         # Se não há lições no módulo
-        if not lessons:
+        if not lesson_count:
             return {
                 "content_type": "empty_module",
                 "message": "Este módulo não possui lições",
@@ -1973,135 +3017,55 @@ async def get_current_content(
                 }
             }
 
-        # Verificar se ultrapassou todas as lições
-        if lesson_idx >= len(lessons):
-            # Avançar para o próximo módulo automaticamente
-            new_module_idx = module_idx + 1
-
-            if new_module_idx < len(modules):
-                # Atualizar para o próximo módulo
-                user_ref = db.collection(Collections.USERS).document(user_id)
-                user_ref.update({
-                    "progress.current.module_index": new_module_idx,
-                    "progress.current.lesson_index": 0,
-                    "progress.current.step_index": 0
-                })
-
-                # PUBLICAR EVENTO DE MÓDULO COMPLETADO
-                await event_service.publish_event(
-                    event_type=EventTypes.MODULE_COMPLETED,
-                    user_id=user_id,
-                    data={
-                        "module_title": module_data.get("module_title", f"Módulo {module_idx + 1}"),
-                        "area": area,
-                        "subarea": subarea,
-                        "level": level,
-                        "auto_detected": True
-                    }
-                )
-
-                # Recursivamente chamar a função com os novos índices
-                nav_context["module_index"] = new_module_idx
-                nav_context["lesson_index"] = 0
-                nav_context["step_index"] = 0
-                return await get_current_content(current_user, db)
-            else:
-                # Completou todos os módulos
-                return {
-                    "content_type": "level_completed",
-                    "title": "Nível Concluído!",
-                    "message": f"Parabéns! Você completou o nível {level} em {subarea}!",
-                    "current_area": area,
-                    "current_subarea": subarea,
-                    "current_level": level,
-                    "navigation_context": nav_context,
-                    "completed": True,
-                    "next_content": get_next_available_content(area_data, nav_context, db)
-                }
-
         # Processar lição atual
-        lesson_data = lessons[lesson_idx]
-
-        # Se a lição tem passos
-        if "steps" in lesson_data and lesson_data["steps"]:
-            steps = lesson_data["steps"]
-            total_steps = len(steps)
-
-            # Se ultrapassou os passos
-            if step_idx >= total_steps:
-                # Avançar para a próxima lição
-                new_lesson_idx = lesson_idx + 1
-
-                if new_lesson_idx < len(lessons):
-                    # Atualizar para a próxima lição
-                    user_ref = db.collection(Collections.USERS).document(user_id)
-                    user_ref.update({
-                        "progress.current.lesson_index": new_lesson_idx,
-                        "progress.current.step_index": 0
-                    })
-
-                    # PUBLICAR EVENTO DE LIÇÃO COMPLETADA
-                    await event_service.publish_event(
-                        event_type=EventTypes.LESSON_COMPLETED,
-                        user_id=user_id,
-                        data={
-                            "lesson_title": lesson_data.get("lesson_title", f"Lição {lesson_idx + 1}"),
-                            "area": area,
-                            "subarea": subarea,
-                            "level": level,
-                            "module": module_data.get("module_title", f"Módulo {module_idx + 1}"),
-                            "auto_detected": True
-                        }
-                    )
+        lesson_key = (subarea, level, module_idx, lesson_idx)
+        lesson_data = area_index["lessons"].get(lesson_key)
+        if lesson_data is None:
+            raise ValueError(f"Lição inválida: {lesson_idx}")
 
-                    # Recursivamente chamar a função
-                    nav_context["lesson_index"] = new_lesson_idx
-                    nav_context["step_index"] = 0
-                    return await get_current_content(current_user, db)
-                else:
-                    # Avançar para o próximo módulo
-                    new_module_idx = module_idx + 1
-
-                    if new_module_idx < len(modules):
-                        user_ref = db.collection(Collections.USERS).document(user_id)
-                        user_ref.update({
-                            "progress.current.module_index": new_module_idx,
-                            "progress.current.lesson_index": 0,
-                            "progress.current.step_index": 0
-                        })
-
-                        nav_context["module_index"] = new_module_idx
-                        nav_context["lesson_index"] = 0
-                        nav_context["step_index"] = 0
-                        return await get_current_content(current_user, db)
-                    else:
-                        # Completou o nível
-                        return {
-                            "content_type": "level_completed",
-                            "title": "Nível Concluído!",
-                            "message": f"Parabéns! Você completou o nível {level} em {subarea}!",
-                            "current_area": area,
-                            "current_subarea": subarea,
-                            "current_level": level,
-                            "navigation_context": nav_context,
-                            "completed": True,
-                            "next_content": get_next_available_content(area_data, nav_context, db)
-                        }
+        total_steps = sizes[lesson_key]
 
+        # Se a lição tem passos (a posição já foi normalizada acima)
+        if total_steps:
             # Retornar passo atual
-            step_content = steps[step_idx]
+            step_content = area_index["steps"].get(lesson_key + (step_idx,))
+            if step_content is None:
+                raise ValueError(f"Passo inválido: {step_idx}")
 
             # Expandir conteúdo
             user_age = current_user.get("age", 14)
             teaching_style = current_user.get("learning_style", "didático")
 
-            expanded_content = call_teacher_llm(
-                f"Explique de forma didática para um estudante de {user_age} anos: {step_content}. "
-                f"Contexto: Área: {area}, Subárea: {subarea}, Nível: {level}. "
-                f"Use exemplos práticos e linguagem acessível.",
-                student_age=user_age,
-                subject_area=area,
-                teaching_style=teaching_style
+            # Conteúdo expandido é compartilhado entre estudantes da mesma faixa etária
+            content_key = build_content_cache_key(
+                area, subarea, level, module_idx, lesson_idx, step_idx, user_age, teaching_style,
+                str(step_content)
+            )
+            expanded_content = await asyncio.to_thread(get_cached_content, db, content_key)
+
+            content_status = {"content_status": "ready"}
+            if expanded_content is None:
+                # Geração do LLM fora do ciclo da requisição
+                content_status = await schedule_content_job(
+                    background_tasks, db, content_key,
+                    partial(generate_step_content, step_content, area, subarea, level, user_age, teaching_style),
+                    {
+                        "area": area,
+                        "subarea": subarea,
+                        "level": level,
+                        "module_index": module_idx,
+                        "lesson_index": lesson_idx,
+                        "step_index": step_idx,
+                        "age_bucket": get_age_bucket(user_age),
+                        "teaching_style": teaching_style
+                    }
+                )
+                response.status_code = status.HTTP_202_ACCEPTED
+
+            # Deixar o conteúdo seguinte pronto para a próxima requisição
+            await prefetch_next_content(
+                background_tasks, db, area_index, area, subarea, level,
+                (module_idx, lesson_idx, step_idx), user_age, teaching_style
             )
 
             # PUBLICAR EVENTO DE LIÇÃO INICIADA (se for o primeiro passo)
@@ -2119,22 +3083,19 @@ async def get_current_content(
                     }
                 )
 
+            # Fração do passo atual, reaproveitada nas porcentagens
+            step_fraction = (step_idx + 1) / total_steps
+
             return {
                 "content_type": "step",
                 "title": lesson_data.get("lesson_title", f"Lição {lesson_idx + 1}"),
                 "content": expanded_content,
+                **content_status,
                 "original_step": step_content,
                 "current_area": area,
                 "current_subarea": subarea,
                 "current_level": level,
-                "navigation_context": {
-                    "area": area,
-                    "subarea": subarea,
-                    "level": level,
-                    "module_index": module_idx,
-                    "lesson_index": lesson_idx,
-                    "step_index": step_idx
-                },
+                "navigation_context": nav_context,
                 "context": {
                     "module": module_data.get("module_title", f"Módulo {module_idx + 1}"),
                     "lesson": lesson_data.get("lesson_title", f"Lição {lesson_idx + 1}"),
@@ -2142,30 +3103,52 @@ async def get_current_content(
                 },
                 "navigation": {
                     "has_previous": step_idx > 0 or lesson_idx > 0 or module_idx > 0,
-                    "has_next": step_idx < total_steps - 1 or lesson_idx < len(lessons) - 1 or module_idx < len(
-                        modules) - 1
+                    "has_next": step_idx < total_steps - 1 or lesson_idx < lesson_count - 1 or module_idx < module_count - 1
                 },
                 "progress": {
-                    "step": (step_idx + 1) / total_steps * 100,
-                    "lesson": (lesson_idx + (step_idx + 1) / total_steps) / len(lessons) * 100,
-                    "module": (module_idx + (lesson_idx + 1) / len(lessons)) / len(modules) * 100
+                    "step": step_fraction * 100,
+                    "lesson": (lesson_idx + step_fraction) / lesson_count * 100,
+                    "module": (module_idx + (lesson_idx + 1) / lesson_count) / module_count * 100
                 }
             }
         else:
             # Lição sem passos - gerar conteúdo completo
+            nav_context["step_index"] = 0
             lesson_title = lesson_data.get("lesson_title", f"Lição {lesson_idx + 1}")
             objectives = lesson_data.get("objectives", "")
 
             user_age = current_user.get("age", 14)
             teaching_style = current_user.get("learning_style", "didático")
 
-            lesson = generate_complete_lesson(
-                topic=lesson_title,
-                subject_area=f"{area} - {subarea}",
-                age_range=user_age,
-                knowledge_level=level,
-                teaching_style=teaching_style,
-                lesson_duration_min=30
+            content_key = build_content_cache_key(
+                area, subarea, level, module_idx, lesson_idx, None, user_age, teaching_style,
+                lesson_title
+            )
+            lesson_text = await asyncio.to_thread(get_cached_content, db, content_key)
+
+            content_status = {"content_status": "ready"}
+            if lesson_text is None:
+                # Geração da lição completa fora do ciclo da requisição
+                content_status = await schedule_content_job(
+                    background_tasks, db, content_key,
+                    partial(generate_lesson_content, lesson_title, area, subarea, level, user_age, teaching_style),
+                    {
+                        "area": area,
+                        "subarea": subarea,
+                        "level": level,
+                        "module_index": module_idx,
+                        "lesson_index": lesson_idx,
+                        "step_index": None,
+                        "age_bucket": get_age_bucket(user_age),
+                        "teaching_style": teaching_style
+                    }
+                )
+                response.status_code = status.HTTP_202_ACCEPTED
+
+            # Deixar o conteúdo seguinte pronto para a próxima requisição
+            await prefetch_next_content(
+                background_tasks, db, area_index, area, subarea, level,
+                (module_idx, lesson_idx, 0), user_age, teaching_style
             )
 
             # PUBLICAR EVENTO DE LIÇÃO INICIADA
@@ -2185,33 +3168,27 @@ async def get_current_content(
             return {
                 "content_type": "lesson",
                 "title": lesson_title,
-                "content": lesson.to_text(),
+                "content": lesson_text,
+                **content_status,
                 "objectives": objectives,
                 "current_area": area,
                 "current_subarea": subarea,
                 "current_level": level,
-                "navigation_context": {
-                    "area": area,
-                    "subarea": subarea,
-                    "level": level,
-                    "module_index": module_idx,
-                    "lesson_index": lesson_idx,
-                    "step_index": 0
-                },
+                "navigation_context": nav_context,
                 "context": {
                     "module": module_data.get("module_title", f"Módulo {module_idx + 1}"),
                     "lesson": lesson_title
                 },
                 "navigation": {
                     "has_previous": lesson_idx > 0 or module_idx > 0,
-                    "has_next": lesson_idx < len(lessons) - 1 or module_idx < len(modules) - 1
+                    "has_next": lesson_idx < lesson_count - 1 or module_idx < module_count - 1
                 }
             }
 
     except Exception as e:
-        # Em caso de qualquer erro, retornar contexto seguro
-        import traceback
-        error_details = traceback.format_exc()
+        # Em caso de qualquer erro, retornar contexto seguro; o traceback só é
+        # formatado pelo handler de log
+        logger.exception(f"Erro ao carregar conteúdo atual para {user_id}")
 
         return {
             "content_type": "error",
@@ -2254,33 +3231,53 @@ def get_assessment_feedback(score: float, passed: bool) -> str:
         return "Não desista! Revise o material e tente novamente quando estiver pronto."
 
 
-def get_last_activity_for_subarea(user_data: dict, area: str, subarea: str) -> Optional[float]:
-    """Obtém timestamp da última atividade em uma subárea específica"""
+async def get_last_activity_for_subarea(db, user_data: dict, area: str, subarea: str) -> Optional[float]:
+    """
+    Obtém timestamp da última atividade em uma subárea específica
+
+    Após a migração para as subcoleções, faz duas consultas indexadas com
+    limit(1) (lições e módulos) em paralelo; antes dela, percorre os arrays.
+    """
+    if not completions_migrated(user_data):
+        return get_last_activity_from_history(user_data, area, subarea)
+
+    dates = await asyncio.gather(*(
+        asyncio.to_thread(get_last_completion_date, db, user_data["id"], subcollection, area, subarea)
+        for subcollection in (Collections.COMPLETED_LESSONS, Collections.COMPLETED_MODULES)
+    ))
+
+    timestamps = []
+    for completion_date in dates:
+        if not completion_date:
+            continue
+        try:
+            timestamps.append(date_to_timestamp(completion_date))
+        except (AttributeError, TypeError, ValueError):
+            continue
+
+    return max(timestamps, default=None)
+
+
+def get_last_activity_from_history(user_data: dict, area: str, subarea: str) -> Optional[float]:
+    """Obtém timestamp da última atividade em uma subárea a partir dos arrays legados"""
     last_activity = None
 
-    # Verificar lições
-    for lesson in user_data.get("completed_lessons", []):
-        if lesson.get("area") == area and lesson.get("subarea") == subarea:
-            lesson_date = lesson.get("completion_date")
-            if lesson_date:
-                try:
-                    timestamp = time.mktime(time.strptime(lesson_date, "%Y-%m-%d"))
-                    if not last_activity or timestamp > last_activity:
-                        last_activity = timestamp
-                except:
-                    pass
-
-    # Verificar módulos
-    for module in user_data.get("completed_modules", []):
-        if module.get("area") == area and module.get("subarea") == subarea:
-            module_date = module.get("completion_date")
-            if module_date:
-                try:
-                    timestamp = time.mktime(time.strptime(module_date, "%Y-%m-%d"))
-                    if not last_activity or timestamp > last_activity:
-                        last_activity = timestamp
-                except:
-                    pass
+    # Lições e módulos em uma única passada; date_to_timestamp é memorizado
+    for item in chain(user_data.get("completed_lessons", []), user_data.get("completed_modules", [])):
+        if item.get("area") != area or item.get("subarea") != subarea:
+            continue
+
+        completion_date = item.get("completion_date")
+        if not completion_date:
+            continue
+
+        try:
+            timestamp = date_to_timestamp(completion_date)
+        except (AttributeError, TypeError, ValueError):
+            continue
+
+        if last_activity is None or timestamp > last_activity:
+            last_activity = timestamp
 
     return last_activity
 
@@ -2294,7 +3291,7 @@ async def advance_to_next_level(
     Avança manualmente para o próximo nível após confirmação do usuário
     """
     user_id = current_user["id"]
-    progress = get_user_progress(db, user_id)
+    progress = await get_user_progress_async(db, user_id)
 
     if not progress:
         raise HTTPException(
@@ -2303,18 +3300,16 @@ async def advance_to_next_level(
         )
 
     current_level = progress.get("current", {}).get("level", "iniciante")
-    levels_order = ["iniciante", "intermediário", "avançado"]
 
-    current_index = levels_order.index(current_level) if current_level in levels_order else 0
+    # Níveis desconhecidos são tratados como o primeiro
+    next_level = get_next_level_in_order(current_level if current_level in LEVEL_INDEX else LEVELS_ORDER[0])
 
-    if current_index >= len(levels_order) - 1:
+    if next_level is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Já está no nível máximo"
         )
 
-    next_level = levels_order[current_index + 1]
-
     # Atualizar progresso
     new_progress = {
         "area": progress.get("area"),
@@ -2329,7 +3324,8 @@ async def advance_to_next_level(
     }
 
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({"progress": new_progress})
+    await asyncio.to_thread(user_ref.update, {"progress": new_progress, "updated_at": SERVER_TIMESTAMP})
+    invalidate_progress_cache(user_id)
 
     # PUBLICAR EVENTO
     await event_service.publish_event(
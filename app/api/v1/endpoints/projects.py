@@ -1,8 +1,10 @@
 # app/api/v1/endpoints/projects.py
 from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from google.cloud.firestore import ArrayUnion
+from google.cloud.firestore import ArrayUnion, ArrayRemove, Increment, SERVER_TIMESTAMP
+import asyncio
 import time
+from datetime import date
 
 from app.core.security import get_current_user, get_current_user_id_required
 from app.database import get_db, Collections
@@ -16,10 +18,19 @@ from app.schemas.projects import (
     ProjectListResponse,
     ProjectDetailResponse
 )
-from app.utils.gamification import add_user_xp, grant_badge, XP_REWARDS
+from app.utils.gamification import add_user_xp_async, grant_badge_async, build_daily_stats_update, XP_REWARDS
+from app.utils.cache_system import invalidate_progress_cache
+from app.utils.write_coalescer import write_coalescer, PendingWrites
+from app.utils.progress_utils import claim_completion_async, release_completion_async, get_completion_id
 
 router = APIRouter()
 
+# Recompensas de XP por tipo de projeto, resolvidas uma única vez na importação
+XP_START_PROJECT = XP_REWARDS.get("start_project", 10)
+START_PROJECT_XP = {"final": 15, "module": 12}
+XP_COMPLETE_PROJECT = XP_REWARDS.get("complete_project", 25)
+COMPLETE_PROJECT_XP = {"final": XP_REWARDS.get("complete_final_project", 50), "module": 35}
+
 
 @router.get("/", response_model=ProjectListResponse)
 async def list_user_projects(
@@ -60,10 +71,11 @@ async def list_user_projects(
     filtered_projects = filtered_projects[:limit]
 
     # Converter para resposta
+    listed_at = int(time.time())
     projects = []
     for project in filtered_projects:
         projects.append(ProjectResponse(
-            id=f"{current_user['id']}_{project.get('title', '')}_{int(time.time())}",
+            id=f"{current_user['id']}_{project.get('title', '')}_{listed_at}",
             title=project.get("title", ""),
             description=project.get("description", ""),
             type=project.get("type", "personal"),
@@ -105,11 +117,13 @@ async def create_project(
         )
 
     # Criar estrutura do projeto
+    now = time.time()
     project_data = {
         "title": request.title,
         "type": request.type,
         "description": request.description or "",
-        "start_date": time.strftime("%Y-%m-%d"),
+        "start_date": date.fromtimestamp(now).isoformat(),
+        "start_timestamp": now,
         "status": "in_progress",
         "area": request.area,
         "subarea": request.subarea,
@@ -118,21 +132,21 @@ async def create_project(
 
     # Adicionar à lista de projetos iniciados
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "started_projects": ArrayUnion([project_data])
+    await asyncio.to_thread(user_ref.update, {
+        "started_projects": ArrayUnion([project_data]),
+        "stats.active_projects_count": Increment(1),
+        **build_daily_stats_update(project_data["start_date"], projects_started=1),
+        "updated_at": SERVER_TIMESTAMP
     })
+    invalidate_progress_cache(user_id)
 
     # Adicionar XP baseado no tipo do projeto
-    xp_amount = XP_REWARDS.get("start_project", 10)
-    if request.type == "final":
-        xp_amount = 15
-    elif request.type == "module":
-        xp_amount = 12
+    xp_amount = START_PROJECT_XP.get(request.type, XP_START_PROJECT)
 
-    add_user_xp(db, user_id, xp_amount, f"Iniciou projeto: {request.title}")
+    await add_user_xp_async(db, user_id, xp_amount, f"Iniciou projeto: {request.title}")
 
     return ProjectResponse(
-        id=f"{user_id}_{request.title}_{int(time.time())}",
+        id=f"{user_id}_{request.title}_{int(now)}",
         title=request.title,
         description=request.description or "",
         type=request.type,
@@ -194,7 +208,7 @@ async def get_project_details(
     curriculum_info = None
     if project.get("area"):
         area_ref = db.collection(Collections.LEARNING_PATHS).document(project["area"])
-        area_doc = area_ref.get()
+        area_doc = await asyncio.to_thread(area_ref.get)
 
         if area_doc.exists and project.get("subarea"):
             area_data = area_doc.to_dict()
@@ -258,26 +272,18 @@ async def update_project(
             detail="Invalid project ID format"
         )
 
-    # Buscar e atualizar projeto
+    # Buscar e atualizar projeto (projetos iniciados já carregados por get_current_user)
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
-    user_data = user_doc.to_dict()
-    started_projects = user_data.get("started_projects", [])
+    started_projects = current_user.get("started_projects", [])
 
     # Encontrar e atualizar o projeto
+    today = date.today().isoformat()
+    original_projects = []
     updated_projects = []
-    project_found = False
 
     for project in started_projects:
         if project.get("title") == project_title:
-            project_found = True
+            original_projects.append(project)
             updated_project = project.copy()
 
             # Atualizar campos fornecidos
@@ -290,19 +296,22 @@ async def update_project(
             if request.evidence_urls is not None:
                 updated_project["evidence_urls"] = request.evidence_urls
 
-            updated_project["last_updated"] = time.strftime("%Y-%m-%d")
+            updated_project["last_updated"] = today
             updated_projects.append(updated_project)
-        else:
-            updated_projects.append(project)
 
-    if not project_found:
+    if not original_projects:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    # Atualizar no banco
-    user_ref.update({"started_projects": updated_projects})
+    # Trocar apenas os itens alterados, sem reenviar o array inteiro; o mesmo
+    # campo não pode ter dois transforms em um update, então usamos um batch
+    batch = db.batch()
+    batch.update(user_ref, {"started_projects": ArrayRemove(original_projects)})
+    batch.update(user_ref, {"started_projects": ArrayUnion(updated_projects), "updated_at": SERVER_TIMESTAMP})
+    await asyncio.to_thread(batch.commit)
+    invalidate_progress_cache(user_id)
 
     return {"message": "Project updated successfully"}
 
@@ -329,26 +338,20 @@ async def complete_project(
         )
 
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
 
-    user_data = user_doc.to_dict()
-    started_projects = user_data.get("started_projects", [])
+    # Projetos iniciados já carregados por get_current_user; a remoção usa
+    # ArrayRemove dos itens exatos, então uma leitura desatualizada não apaga
+    # projetos iniciados em paralelo
+    started_projects = current_user.get("started_projects", [])
 
     # Encontrar o projeto
     project_to_complete = None
-    updated_started_projects = []
+    removed_projects = []
 
     for project in started_projects:
         if project.get("title") == project_title:
             project_to_complete = project.copy()
-        else:
-            updated_started_projects.append(project)
+            removed_projects.append(project)
 
     if not project_to_complete:
         raise HTTPException(
@@ -358,7 +361,10 @@ async def complete_project(
 
     # Criar projeto concluído
     completed_project = project_to_complete.copy()
-    completed_project["completion_date"] = time.strftime("%Y-%m-%d")
+    now = time.time()
+    today = date.fromtimestamp(now).isoformat()
+    completed_project["completion_date"] = today
+    completed_project["timestamp"] = now
     completed_project["status"] = "completed"
 
     if request.final_outcomes:
@@ -370,21 +376,39 @@ async def complete_project(
     if request.reflection:
         completed_project["reflection"] = request.reflection
 
-    # Atualizar no banco
-    user_ref.update({
-        "started_projects": updated_started_projects,
-        "completed_projects": ArrayUnion([completed_project])
-    })
-
-    # Adicionar XP e badges
-    xp_amount = XP_REWARDS.get("complete_project", 25)
+    # Preparar XP e badge sem gravar: as leituras rodam em paralelo e as
+    # escritas vão no mesmo batch da conclusão
+    xp_amount = COMPLETE_PROJECT_XP.get(project_to_complete.get("type"), XP_COMPLETE_PROJECT)
+    writes = PendingWrites()
+    tasks = [add_user_xp_async(db, user_id, xp_amount, f"Completou projeto: {project_title}", batch=writes)]
     if project_to_complete.get("type") == "final":
-        xp_amount = XP_REWARDS.get("complete_final_project", 50)
-        grant_badge(db, user_id, f"Projeto Final: {project_title[:20]}")
-    elif project_to_complete.get("type") == "module":
-        xp_amount = 35
+        tasks.append(grant_badge_async(db, user_id, f"Projeto Final: {project_title[:20]}", batch=writes))
+
+    xp_result = (await asyncio.gather(*tasks))[0]
 
-    xp_result = add_user_xp(db, user_id, xp_amount, f"Completou projeto: {project_title}")
+    # Registro único na subcoleção: duas conclusões simultâneas do mesmo
+    # projeto não contam em dobro
+    completion_id = get_completion_id(Collections.COMPLETED_PROJECTS, completed_project)
+    if not await claim_completion_async(db, user_id, Collections.COMPLETED_PROJECTS, completion_id, completed_project):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Project already completed"
+        )
+
+    # Atualizar no banco: conclusão, XP e badge em um único commit atômico
+    try:
+        await write_coalescer.update_many(db, user_id, [(user_ref, {
+            "started_projects": ArrayRemove(removed_projects),
+            "completed_projects": ArrayUnion([completed_project]),
+            "stats.completed_projects_count": Increment(1),
+            "stats.active_projects_count": Increment(-len(removed_projects)),
+            **build_daily_stats_update(today, projects_completed=1),
+            "updated_at": SERVER_TIMESTAMP
+        })] + writes.ops)
+    except Exception:
+        await release_completion_async(db, user_id, Collections.COMPLETED_PROJECTS, completion_id)
+        raise
+    invalidate_progress_cache(user_id)
 
     return {
         "message": "Project completed successfully",
@@ -416,6 +440,7 @@ async def submit_project_feedback(
         )
 
     # Criar registro de feedback
+    now = time.time()
     feedback_data = {
         "project_id": project_id,
         "project_title": project_title,
@@ -425,15 +450,15 @@ async def submit_project_feedback(
         "relevance_rating": request.relevance_rating,
         "comments": request.comments or "",
         "suggestions": request.suggestions or "",
-        "timestamp": time.time(),
-        "date": time.strftime("%Y-%m-%d")
+        "timestamp": now,
+        "date": date.fromtimestamp(now).isoformat()
     }
 
     # Salvar feedback
-    db.collection("project_feedback").add(feedback_data)
+    await asyncio.to_thread(db.collection("project_feedback").add, feedback_data)
 
     # Adicionar XP por fornecer feedback
-    add_user_xp(db, user_id, 5, f"Forneceu feedback para projeto: {project_title}")
+    await add_user_xp_async(db, user_id, 5, f"Forneceu feedback para projeto: {project_title}")
 
     return {
         "message": "Feedback submitted successfully",
@@ -458,7 +483,7 @@ async def get_available_projects(
     """
     # Buscar dados da área
     area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-    area_doc = area_ref.get()
+    area_doc = await asyncio.to_thread(area_ref.get)
 
     if not area_doc.exists:
         raise HTTPException(
@@ -598,8 +623,10 @@ async def get_available_projects(
 # app/api/v1/endpoints/projects.py
 from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from google.cloud.firestore import ArrayUnion
+from google.cloud.firestore import ArrayUnion, ArrayRemove, Increment, SERVER_TIMESTAMP
+import asyncio
 import time
+from datetime import date
 
 from app.core.security import get_current_user, get_current_user_id_required
 from app.database import get_db, Collections
@@ -613,10 +640,19 @@ from app.schemas.projects import (
     ProjectListResponse,
     ProjectDetailResponse
 )
-from app.utils.gamification import add_user_xp, grant_badge, XP_REWARDS
+from app.utils.gamification import add_user_xp_async, grant_badge_async, build_daily_stats_update, XP_REWARDS
+from app.utils.cache_system import invalidate_progress_cache
+from app.utils.write_coalescer import write_coalescer, PendingWrites
+from app.utils.progress_utils import claim_completion_async, release_completion_async, get_completion_id
 
 router = APIRouter()
 
+# Recompensas de XP por tipo de projeto, resolvidas uma única vez na importação
+XP_START_PROJECT = XP_REWARDS.get("start_project", 10)
+START_PROJECT_XP = {"final": 15, "module": 12}
+XP_COMPLETE_PROJECT = XP_REWARDS.get("complete_project", 25)
+COMPLETE_PROJECT_XP = {"final": XP_REWARDS.get("complete_final_project", 50), "module": 35}
+
 
 @router.get("/", response_model=ProjectListResponse)
 async def list_user_projects(
@@ -657,10 +693,11 @@ async def list_user_projects(
     filtered_projects = filtered_projects[:limit]
 
     # Converter para resposta
+    listed_at = int(time.time())
     projects = []
     for project in filtered_projects:
         projects.append(ProjectResponse(
-            id=f"{current_user['id']}_{project.get('title', '')}_{int(time.time())}",
+            id=f"{current_user['id']}_{project.get('title', '')}_{listed_at}",
             title=project.get("title", ""),
             description=project.get("description", ""),
             type=project.get("type", "personal"),
@@ -702,11 +739,13 @@ async def create_project(
         )
 
     # Criar estrutura do projeto
+    now = time.time()
     project_data = {
         "title": request.title,
         "type": request.type,
         "description": request.description or "",
-        "start_date": time.strftime("%Y-%m-%d"),
+        "start_date": date.fromtimestamp(now).isoformat(),
+        "start_timestamp": now,
         "status": "in_progress",
         "area": request.area,
         "subarea": request.subarea,
@@ -715,21 +754,21 @@ async def create_project(
 
     # Adicionar à lista de projetos iniciados
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_ref.update({
-        "started_projects": ArrayUnion([project_data])
+    await asyncio.to_thread(user_ref.update, {
+        "started_projects": ArrayUnion([project_data]),
+        "stats.active_projects_count": Increment(1),
+        **build_daily_stats_update(project_data["start_date"], projects_started=1),
+        "updated_at": SERVER_TIMESTAMP
     })
+    invalidate_progress_cache(user_id)
 
     # Adicionar XP baseado no tipo do projeto
-    xp_amount = XP_REWARDS.get("start_project", 10)
-    if request.type == "final":
-        xp_amount = 15
-    elif request.type == "module":
-        xp_amount = 12
+    xp_amount = START_PROJECT_XP.get(request.type, XP_START_PROJECT)
 
-    add_user_xp(db, user_id, xp_amount, f"Iniciou projeto: {request.title}")
+    await add_user_xp_async(db, user_id, xp_amount, f"Iniciou projeto: {request.title}")
 
     return ProjectResponse(
-        id=f"{user_id}_{request.title}_{int(time.time())}",
+        id=f"{user_id}_{request.title}_{int(now)}",
         title=request.title,
         description=request.description or "",
         type=request.type,
@@ -791,7 +830,7 @@ async def get_project_details(
     curriculum_info = None
     if project.get("area"):
         area_ref = db.collection(Collections.LEARNING_PATHS).document(project["area"])
-        area_doc = area_ref.get()
+        area_doc = await asyncio.to_thread(area_ref.get)
 
         if area_doc.exists and project.get("subarea"):
             area_data = area_doc.to_dict()
@@ -855,26 +894,18 @@ async def update_project(
             detail="Invalid project ID format"
         )
 
-    # Buscar e atualizar projeto
+    # Buscar e atualizar projeto (projetos iniciados já carregados por get_current_user)
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-
-    user_data = user_doc.to_dict()
-    started_projects = user_data.get("started_projects", [])
+    started_projects = current_user.get("started_projects", [])
 
     # Encontrar e atualizar o projeto
+    today = date.today().isoformat()
+    original_projects = []
     updated_projects = []
-    project_found = False
 
     for project in started_projects:
         if project.get("title") == project_title:
-            project_found = True
+            original_projects.append(project)
             updated_project = project.copy()
 
             # Atualizar campos fornecidos
@@ -887,19 +918,22 @@ async def update_project(
             if request.evidence_urls is not None:
                 updated_project["evidence_urls"] = request.evidence_urls
 
-            updated_project["last_updated"] = time.strftime("%Y-%m-%d")
+            updated_project["last_updated"] = today
             updated_projects.append(updated_project)
-        else:
-            updated_projects.append(project)
 
-    if not project_found:
+    if not original_projects:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
 
-    # Atualizar no banco
-    user_ref.update({"started_projects": updated_projects})
+    # Trocar apenas os itens alterados, sem reenviar o array inteiro; o mesmo
+    # campo não pode ter dois transforms em um update, então usamos um batch
+    batch = db.batch()
+    batch.update(user_ref, {"started_projects": ArrayRemove(original_projects)})
+    batch.update(user_ref, {"started_projects": ArrayUnion(updated_projects), "updated_at": SERVER_TIMESTAMP})
+    await asyncio.to_thread(batch.commit)
+    invalidate_progress_cache(user_id)
 
     return {"message": "Project updated successfully"}
 
@@ -926,26 +960,20 @@ async def complete_project(
         )
 
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
-
-    if not user_doc.exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
 
-    user_data = user_doc.to_dict()
-    started_projects = user_data.get("started_projects", [])
+    # Projetos iniciados já carregados por get_current_user; a remoção usa
+    # ArrayRemove dos itens exatos, então uma leitura desatualizada não apaga
+    # projetos iniciados em paralelo
+    started_projects = current_user.get("started_projects", [])
 
     # Encontrar o projeto
     project_to_complete = None
-    updated_started_projects = []
+    removed_projects = []
 
     for project in started_projects:
         if project.get("title") == project_title:
             project_to_complete = project.copy()
-        else:
-            updated_started_projects.append(project)
+            removed_projects.append(project)
 
     if not project_to_complete:
         raise HTTPException(
@@ -955,7 +983,10 @@ async def complete_project(
 
     # Criar projeto concluído
     completed_project = project_to_complete.copy()
-    completed_project["completion_date"] = time.strftime("%Y-%m-%d")
+    now = time.time()
+    today = date.fromtimestamp(now).isoformat()
+    completed_project["completion_date"] = today
+    completed_project["timestamp"] = now
     completed_project["status"] = "completed"
 
     if request.final_outcomes:
@@ -967,21 +998,39 @@ async def complete_project(
     if request.reflection:
         completed_project["reflection"] = request.reflection
 
-    # Atualizar no banco
-    user_ref.update({
-        "started_projects": updated_started_projects,
-        "completed_projects": ArrayUnion([completed_project])
-    })
-
-    # Adicionar XP e badges
-    xp_amount = XP_REWARDS.get("complete_project", 25)
+    # Preparar XP e badge sem gravar: as leituras rodam em paralelo e as
+    # escritas vão no mesmo batch da conclusão
+    xp_amount = COMPLETE_PROJECT_XP.get(project_to_complete.get("type"), XP_COMPLETE_PROJECT)
+    writes = PendingWrites()
+    tasks = [add_user_xp_async(db, user_id, xp_amount, f"Completou projeto: {project_title}", batch=writes)]
     if project_to_complete.get("type") == "final":
-        xp_amount = XP_REWARDS.get("complete_final_project", 50)
-        grant_badge(db, user_id, f"Projeto Final: {project_title[:20]}")
-    elif project_to_complete.get("type") == "module":
-        xp_amount = 35
+        tasks.append(grant_badge_async(db, user_id, f"Projeto Final: {project_title[:20]}", batch=writes))
+
+    xp_result = (await asyncio.gather(*tasks))[0]
 
-    xp_result = add_user_xp(db, user_id, xp_amount, f"Completou projeto: {project_title}")
+    # Registro único na subcoleção: duas conclusões simultâneas do mesmo
+    # projeto não contam em dobro
+    completion_id = get_completion_id(Collections.COMPLETED_PROJECTS, completed_project)
+    if not await claim_completion_async(db, user_id, Collections.COMPLETED_PROJECTS, completion_id, completed_project):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Project already completed"
+        )
+
+    # Atualizar no banco: conclusão, XP e badge em um único commit atômico
+    try:
+        await write_coalescer.update_many(db, user_id, [(user_ref, {
+            "started_projects": ArrayRemove(removed_projects),
+            "completed_projects": ArrayUnion([completed_project]),
+            "stats.completed_projects_count": Increment(1),
+            "stats.active_projects_count": Increment(-len(removed_projects)),
+            **build_daily_stats_update(today, projects_completed=1),
+            "updated_at": SERVER_TIMESTAMP
+        })] + writes.ops)
+    except Exception:
+        await release_completion_async(db, user_id, Collections.COMPLETED_PROJECTS, completion_id)
+        raise
+    invalidate_progress_cache(user_id)
 
     return {
         "message": "Project completed successfully",
@@ -1013,6 +1062,7 @@ async def submit_project_feedback(
         )
 
     # Criar registro de feedback
+    now = time.time()
     feedback_data = {
         "project_id": project_id,
         "project_title": project_title,
@@ -1022,15 +1072,15 @@ async def submit_project_feedback(
         "relevance_rating": request.relevance_rating,
         "comments": request.comments or "",
         "suggestions": request.suggestions or "",
-        "timestamp": time.time(),
-        "date": time.strftime("%Y-%m-%d")
+        "timestamp": now,
+        "date": date.fromtimestamp(now).isoformat()
     }
 
     # Salvar feedback
-    db.collection("project_feedback").add(feedback_data)
+    await asyncio.to_thread(db.collection("project_feedback").add, feedback_data)
 
     # Adicionar XP por fornecer feedback
-    add_user_xp(db, user_id, 5, f"Forneceu feedback para projeto: {project_title}")
+    await add_user_xp_async(db, user_id, 5, f"Forneceu feedback para projeto: {project_title}")
 
     return {
         "message": "Feedback submitted successfully",
@@ -1055,7 +1105,7 @@ async def get_available_projects(
     """
     # Buscar dados da área
     area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-    area_doc = area_ref.get()
+    area_doc = await asyncio.to_thread(area_ref.get)
 
     if not area_doc.exists:
         raise HTTPException(
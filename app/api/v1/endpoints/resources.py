@@ -18,6 +18,8 @@ from app.schemas.resources import (
     ResourceSearchRequest
 )
 from app.utils.gamification import add_user_xp
+from app.utils.cache_system import invalidate_user_cache
+from app.utils.progress_utils import get_specialization_names
 
 router = APIRouter()
 
@@ -206,14 +208,15 @@ async def register_resource_access(
     """
     user_id = current_user["id"]
 
-    # Registrar acesso
+    # Registrar acesso (data e timestamp da mesma leitura do relógio)
+    now = time.time()
     access_data = {
         "resource_id": request.resource_id,
         "title": request.title,
         "type": request.resource_type,
         "area": request.area,
-        "access_date": time.strftime("%Y-%m-%d"),
-        "timestamp": time.time()
+        "access_date": time.strftime("%Y-%m-%d", time.localtime(now)),
+        "timestamp": now
     }
 
     # Adicionar à lista de recursos acessados
@@ -221,6 +224,7 @@ async def register_resource_access(
     user_ref.update({
         "accessed_resources": ArrayUnion([access_data])
     })
+    invalidate_user_cache(user_id)
 
     # Adicionar XP
     add_user_xp(db, user_id, 2, f"Acessou recurso: {request.title}")
@@ -243,6 +247,7 @@ async def submit_resource_feedback(
     user_id = current_user["id"]
 
     # Criar registro de feedback
+    now = time.time()
     feedback_data = {
         "user_id": user_id,
         "resource_id": request.resource_id,
@@ -251,8 +256,8 @@ async def submit_resource_feedback(
         "difficulty_rating": request.difficulty_rating,
         "comments": request.comments or "",
         "would_recommend": request.would_recommend,
-        "timestamp": time.time(),
-        "date": time.strftime("%Y-%m-%d")
+        "timestamp": now,
+        "date": time.strftime("%Y-%m-%d", time.localtime(now))
     }
 
     # Salvar feedback
@@ -398,6 +403,10 @@ async def get_specializations(
     completed_levels = current_user.get("completed_levels", [])
     completed_level_names = [level.get("level") for level in completed_levels]
 
+    # Especializações do usuário (subcoleções + arrays legados), lidas uma vez
+    started_names = get_specialization_names(db, user_id, Collections.SPECIALIZATIONS_STARTED, current_user)
+    completed_names = get_specialization_names(db, user_id, Collections.COMPLETED_SPECIALIZATIONS, current_user)
+
     specialization_list = []
 
     for spec in specializations:
@@ -405,13 +414,9 @@ async def get_specializations(
         prereqs = spec.get("prerequisites", [])
         meets_prereqs = all(prereq in completed_level_names for prereq in prereqs)
 
-        # Verificar se já foi iniciada
-        specializations_started = current_user.get("specializations_started", [])
-        is_started = any(s.get("name") == spec.get("name") for s in specializations_started)
-
-        # Verificar se foi concluída
-        completed_specializations = current_user.get("completed_specializations", [])
-        is_completed = any(s.get("name") == spec.get("name") for s in completed_specializations)
+        # Verificar se já foi iniciada / concluída
+        is_started = spec.get("name") in started_names
+        is_completed = spec.get("name") in completed_names
 
         specialization_list.append(SpecializationResponse(
             id=f"{area}_{subarea}_{spec.get('name', '')}",
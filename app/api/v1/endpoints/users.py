@@ -1,7 +1,7 @@
 # app/api/v1/endpoints/users.py
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from google.cloud.firestore import FieldFilter
+from google.cloud.firestore import FieldFilter, SERVER_TIMESTAMP
 import time
 
 from app.core.security import get_current_user, get_current_user_id_required
@@ -23,6 +23,8 @@ from app.utils.gamification import (
     XP_REWARDS
 )
 
+from app.utils.cache_system import invalidate_progress_cache, invalidate_user_cache
+
 # IMPORTAR O SERVIÇO DE EVENTOS
 from app.services.event_service import event_service, EventTypes
 
@@ -81,8 +83,8 @@ async def get_user_profile(
     # Calcular projetos ativos
     started = user_data.get("started_projects", [])
     completed = user_data.get("completed_projects", [])
-    completed_titles = [p.get("title") for p in completed]
-    user_data["active_projects_count"] = len([p for p in started if p.get("title") not in completed_titles])
+    completed_titles = {p.get("title") for p in completed}
+    user_data["active_projects_count"] = sum(1 for p in started if p.get("title") not in completed_titles)
 
     return UserProfile(**user_data)
 
@@ -120,7 +122,9 @@ async def update_user(
     update_data = user_update.dict(exclude_unset=True)
 
     # Atualizar no banco
+    update_data["updated_at"] = SERVER_TIMESTAMP
     user_ref.update(update_data)
+    invalidate_user_cache(user_id)
 
     # PUBLICAR EVENTO DE ATUALIZAÇÃO
     await event_service.publish_event(
@@ -180,8 +184,8 @@ async def get_user_statistics(
     # Calcular projetos ativos
     started = user_data.get("started_projects", [])
     completed = user_data.get("completed_projects", [])
-    completed_titles = [p.get("title") for p in completed]
-    stats["active_projects"] = len([p for p in started if p.get("title") not in completed_titles])
+    completed_titles = {p.get("title") for p in completed}
+    stats["active_projects"] = sum(1 for p in started if p.get("title") not in completed_titles)
 
     # Calcular dias ativos
     if user_data.get("created_at"):
@@ -330,7 +334,12 @@ async def update_preferences(
                     f"Mudou estilo de ensino para: {update_data['learning_style']}")
 
     # Atualizar no banco
+    update_data["updated_at"] = SERVER_TIMESTAMP
     user_ref.update(update_data)
+    if "progress" in update_data:
+        invalidate_progress_cache(user_id)
+    else:
+        invalidate_user_cache(user_id)
 
     # PUBLICAR EVENTO DE ATUALIZAÇÃO DE PREFERÊNCIAS
     await event_service.publish_event(
@@ -25,6 +25,7 @@ class Settings(BaseSettings):
     # Firebase/Firestore
     google_application_credentials: Optional[str] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
     firebase_project_id: Optional[str] = os.getenv("FIREBASE_PROJECT_ID")
+    firestore_pool_size: int = int(os.getenv("FIRESTORE_POOL_SIZE", "4"))
 
     # OpenAI
     openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
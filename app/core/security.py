@@ -1,4 +1,6 @@
 # app/core/security.py
+import asyncio
+import copy
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
@@ -121,6 +123,35 @@ async def get_current_user_id_required(
     return token_data.sub
 
 
+async def load_user_data(db, user_id: str) -> Optional[dict]:
+    """
+    Lê o documento do usuário, com cache de poucos segundos neste processo
+
+    Uma ação na interface costuma disparar várias requisições seguidas que
+    leem o mesmo documento; as escritas deste processo descartam a entrada
+    (invalidate_user_cache). Cada chamador recebe uma cópia, pois as rotas
+    modificam o dicionário recebido.
+
+    Returns:
+        Dados do usuário (com "id") ou None se não existir
+    """
+    # Import tardio: cache_system importa este módulo para proteger suas rotas
+    from app.utils.cache_system import current_user_cache
+
+    user_data = current_user_cache.get(user_id)
+    if user_data is None:
+        user_doc = await asyncio.to_thread(db.collection("users").document(user_id).get)
+
+        if not user_doc.exists:
+            return None
+
+        user_data = user_doc.to_dict()
+        user_data["id"] = user_id
+        current_user_cache.set(user_id, user_data)
+
+    return copy.deepcopy(user_data)
+
+
 async def get_current_user(
         db=Depends(get_db),
         user_id: str = Depends(get_current_user_id_required)
@@ -128,7 +159,51 @@ async def get_current_user(
     """
     Obtém os dados completos do usuário atual
     """
-    user_doc = db.collection("users").document(user_id).get()
+    user_data = await load_user_data(db, user_id)
+
+    if user_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    return user_data
+
+
+# Campos do usuário necessários para as rotas de navegação de progresso
+USER_NAVIGATION_FIELDS = [
+    "progress",
+    "current_track",
+    "saved_progress",
+    "age",
+    "learning_style",
+    "updated_at"
+]
+
+
+async def get_current_user_slim(
+        db=Depends(get_db),
+        user_id: str = Depends(get_current_user_id_required)
+) -> dict:
+    """
+    Obtém apenas os campos de navegação do usuário atual
+
+    Evita transferir os arrays de histórico (lições, XP, projetos) em rotas
+    que só precisam do progresso e das preferências de ensino. Se o documento
+    completo estiver no cache de load_user_data, os campos saem dele.
+    """
+    from app.utils.cache_system import current_user_cache
+
+    cached = current_user_cache.get(user_id)
+    if cached is not None:
+        user_data = {field: copy.deepcopy(cached[field]) for field in USER_NAVIGATION_FIELDS if field in cached}
+        user_data["id"] = user_id
+        return user_data
+
+    user_doc = await asyncio.to_thread(
+        db.collection("users").document(user_id).get,
+        field_paths=USER_NAVIGATION_FIELDS
+    )
 
     if not user_doc.exists:
         raise HTTPException(
@@ -153,12 +228,4 @@ async def get_optional_current_user(
     if not user_id:
         return None
 
-    user_doc = db.collection("users").document(user_id).get()
-
-    if not user_doc.exists:
-        return None
-
-    user_data = user_doc.to_dict()
-    user_data["id"] = user_id
-
-    return user_data
\ No newline at end of file
+    return await load_user_data(db, user_id)
\ No newline at end of file
@@ -1,7 +1,9 @@
 # app/database.py
 from google.cloud import firestore
-from typing import Optional
+from typing import List
 import logging
+import random
+import threading
 from functools import lru_cache
 
 from app.config import get_settings
@@ -11,38 +13,54 @@ settings = get_settings()
 
 
 class FirestoreClient:
-    """Gerenciador de conexão com Firestore"""
+    """
+    Gerenciador de conexão com Firestore
+
+    Mantém um pequeno pool de clientes criado uma única vez por processo; cada
+    cliente reutiliza seu canal gRPC entre requisições e a escolha aleatória
+    distribui as chamadas concorrentes entre os canais.
+    """
+
+    def __init__(self, pool_size: int = 1):
+        self._pool_size = max(pool_size, 1)
+        self._clients: List[firestore.Client] = []
+        self._lock = threading.Lock()
 
-    def __init__(self):
-        self._client: Optional[firestore.Client] = None
+    def _create_client(self) -> firestore.Client:
+        if settings.firebase_project_id:
+            return firestore.Client(project=settings.firebase_project_id)
+        return firestore.Client()
 
     def get_client(self) -> firestore.Client:
         """
-        Retorna o cliente Firestore, criando um se não existir
+        Retorna um cliente Firestore do pool, criando o pool se não existir
         """
-        if self._client is None:
-            try:
-                if settings.firebase_project_id:
-                    self._client = firestore.Client(project=settings.firebase_project_id)
-                else:
-                    self._client = firestore.Client()
-                logger.info("Firestore client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Firestore client: {e}")
-                raise
-
-        return self._client
+        if not self._clients:
+            with self._lock:
+                if not self._clients:
+                    try:
+                        self._clients = [self._create_client() for _ in range(self._pool_size)]
+                        logger.info(f"Firestore client pool initialized with {self._pool_size} client(s)")
+                    except Exception as e:
+                        logger.error(f"Failed to initialize Firestore client: {e}")
+                        raise
+
+        return random.choice(self._clients)
 
     def close(self):
-        """Fecha a conexão com o Firestore"""
-        if self._client:
-            self._client.close()
-            self._client = None
-            logger.info("Firestore client closed")
+        """Fecha as conexões com o Firestore"""
+        with self._lock:
+            clients, self._clients = self._clients, []
+
+        for client in clients:
+            client.close()
+
+        if clients:
+            logger.info("Firestore client pool closed")
 
 
 # Instância global do cliente
-firestore_client = FirestoreClient()
+firestore_client = FirestoreClient(pool_size=settings.firestore_pool_size)
 
 
 def get_db() -> firestore.Client:
@@ -61,6 +79,17 @@ class Collections:
     ACHIEVEMENTS = "achievements"
     ASSESSMENTS = "assessments"
     RESOURCES = "resources"
+    GENERATED_CONTENT = "generated_content"
+    CONTENT_JOBS = "content_jobs"
+
+    # Subcoleções de users/{user_id}
+    COMPLETED_LESSONS = "completed_lessons"
+    COMPLETED_MODULES = "completed_modules"
+    COMPLETED_LEVELS = "completed_levels"
+    COMPLETED_PROJECTS = "completed_projects"
+    SPECIALIZATIONS_STARTED = "specializations_started"
+    COMPLETED_SPECIALIZATIONS = "completed_specializations"
+    CERTIFICATIONS = "certifications"
 
 
 # Índices compostos sugeridos para Firestore
@@ -78,5 +107,22 @@ FIRESTORE_INDEXES = [
             {"fieldPath": "created_at", "order": "DESCENDING"},
             {"fieldPath": "profile_xp", "order": "DESCENDING"}
         ]
+    },
+    # Última conclusão em uma área/subárea (subcoleções de users/{user_id})
+    {
+        "collection": Collections.COMPLETED_LESSONS,
+        "fields": [
+            {"fieldPath": "area", "order": "ASCENDING"},
+            {"fieldPath": "subarea", "order": "ASCENDING"},
+            {"fieldPath": "completion_date", "order": "DESCENDING"}
+        ]
+    },
+    {
+        "collection": Collections.COMPLETED_MODULES,
+        "fields": [
+            {"fieldPath": "area", "order": "ASCENDING"},
+            {"fieldPath": "subarea", "order": "ASCENDING"},
+            {"fieldPath": "completion_date", "order": "DESCENDING"}
+        ]
     }
 ]
\ No newline at end of file
@@ -7,6 +7,7 @@ import logging
 from app.config import get_settings
 from app.api.v1.api import api_router
 from app.database import firestore_client
+from app.utils.write_coalescer import write_coalescer
 
 # Configurar logging
 logging.basicConfig(
@@ -32,6 +33,7 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down the application...")
+    await write_coalescer.flush()
     firestore_client.close()
 
 
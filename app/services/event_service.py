@@ -166,7 +166,7 @@ class EventService:
         try:
             db = next(get_db())
             message = f"Parabéns! Você completou a lição '{data.get('lesson_title', 'Lição')}'!"
-            self._create_notification(db, user_id, "success", message, "/learning")
+            await asyncio.to_thread(self._create_notification, db, user_id, "success", message, "/learning")
         except Exception as e:
             logger.error(f"Erro ao processar lesson_completed: {e}")
 
@@ -175,7 +175,7 @@ class EventService:
         try:
             db = next(get_db())
             message = f"Módulo '{data.get('module_title', 'Módulo')}' concluído! Continue assim!"
-            self._create_notification(db, user_id, "success", message, "/learning")
+            await asyncio.to_thread(self._create_notification, db, user_id, "success", message, "/learning")
         except Exception as e:
             logger.error(f"Erro ao processar module_completed: {e}")
 
@@ -185,7 +185,7 @@ class EventService:
             db = next(get_db())
             level_name = data.get('level_name', '')
             message = f"Incrível! Você completou o nível {level_name}!"
-            self._create_notification(db, user_id, "award", message, "/achievements")
+            await asyncio.to_thread(self._create_notification, db, user_id, "award", message, "/achievements")
         except Exception as e:
             logger.error(f"Erro ao processar level_completed: {e}")
 
@@ -199,7 +199,7 @@ class EventService:
             db = next(get_db())
             new_level = data.get('new_level', 0)
             message = f"Level UP! Você alcançou o nível {new_level}! 🎉"
-            self._create_notification(db, user_id, "award", message, "/profile")
+            await asyncio.to_thread(self._create_notification, db, user_id, "award", message, "/profile")
         except Exception as e:
             logger.error(f"Erro ao processar level_up: {e}")
 
@@ -209,7 +209,7 @@ class EventService:
             db = next(get_db())
             badge_name = data.get('badge_name', 'Nova Conquista')
             message = f"Nova conquista desbloqueada: {badge_name}! 🏆"
-            self._create_notification(db, user_id, "award", message, "/achievements")
+            await asyncio.to_thread(self._create_notification, db, user_id, "award", message, "/achievements")
         except Exception as e:
             logger.error(f"Erro ao processar badge_earned: {e}")
 
@@ -220,7 +220,7 @@ class EventService:
             project_title = data.get('project_title', 'Projeto')
             xp = data.get('xp_earned', 0)
             message = f"Projeto '{project_title}' concluído! +{xp} XP ganhos!"
-            self._create_notification(db, user_id, "success", message, "/projects")
+            await asyncio.to_thread(self._create_notification, db, user_id, "success", message, "/projects")
         except Exception as e:
             logger.error(f"Erro ao processar project_completed: {e}")
 
@@ -230,7 +230,7 @@ class EventService:
             db = next(get_db())
             team_name = data.get('team_name', 'Time')
             message = f"Bem-vindo ao time '{team_name}'! 👥"
-            self._create_notification(db, user_id, "info", message, "/community")
+            await asyncio.to_thread(self._create_notification, db, user_id, "info", message, "/community")
         except Exception as e:
             logger.error(f"Erro ao processar team_joined: {e}")
 
@@ -240,7 +240,7 @@ class EventService:
             db = next(get_db())
             mentor_name = data.get('mentor_name', 'Mentor')
             message = f"{mentor_name} aceitou seu pedido de mentoria! 🎓"
-            self._create_notification(db, user_id, "success", message, "/community")
+            await asyncio.to_thread(self._create_notification, db, user_id, "success", message, "/community")
         except Exception as e:
             logger.error(f"Erro ao processar mentorship_accepted: {e}")
 
@@ -4,6 +4,8 @@ from datetime import datetime
 import logging
 from google.cloud import firestore
 
+from app.utils.cache_system import invalidate_user_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,6 +43,7 @@ class UserService:
             }
 
             user_ref.update(update_data)
+            invalidate_user_cache(user_id)
 
             # Registrar transação de XP
             xp_transaction = {
@@ -97,6 +100,7 @@ class UserService:
             data["updated_at"] = datetime.utcnow()
 
             user_ref.update(data)
+            invalidate_user_cache(user_id)
             logger.info(f"Usuário {user_id} atualizado com sucesso")
 
             return True
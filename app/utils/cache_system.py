@@ -80,6 +80,12 @@ class LRUCache:
 llm_cache = LRUCache(max_size=1000, ttl_seconds=86400)  # 24 horas
 content_cache = LRUCache(max_size=500, ttl_seconds=3600)  # 1 hora
 user_cache = LRUCache(max_size=200, ttl_seconds=300)  # 5 minutos
+progress_cache = LRUCache(max_size=1000, ttl_seconds=60)  # 1 minuto
+generated_content_cache = LRUCache(max_size=2000, ttl_seconds=7 * 86400)  # 7 dias
+learning_path_cache = LRUCache(max_size=100, ttl_seconds=600)  # 10 minutos
+next_content_cache = LRUCache(max_size=1000, ttl_seconds=600)  # 10 minutos, como o currículo
+user_progress_cache = LRUCache(max_size=1000, ttl_seconds=5)  # 5 segundos
+current_user_cache = LRUCache(max_size=1000, ttl_seconds=2)  # 2 segundos
 
 
 def generate_cache_key(prefix: str, **kwargs) -> str:
@@ -197,18 +203,81 @@ def cached_content(ttl_seconds: Optional[int] = None):
     return decorator
 
 
+def progress_cache_version(user_data: dict) -> str:
+    """
+    Obtém a versão do documento do usuário usada nas chaves de progresso.
+
+    Toda escrita que afeta as rotas de progresso atualiza "updated_at", então
+    entradas antigas deixam de ser encontradas em qualquer worker.
+    """
+    updated_at = user_data.get("updated_at")
+    if hasattr(updated_at, "timestamp"):
+        return str(updated_at.timestamp())
+    return str(updated_at or 0)
+
+
+def progress_cache_key(user_id: str, endpoint: str, version: str) -> str:
+    """Gera a chave do cache de respostas de progresso de um usuário."""
+    return f"progress:{user_id}:{endpoint}:{version}"
+
+
+def progress_etag(user_id: str, endpoint: str, version: str) -> str:
+    """Gera o ETag de uma resposta de progresso a partir da mesma versão da chave."""
+    digest = hashlib.md5(progress_cache_key(user_id, endpoint, version).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Gera o ETag de uma resposta a partir do corpo já serializado."""
+    return f'W/"{hashlib.md5(body).hexdigest()}"'
+
+
+def invalidate_progress_cache(user_id: str):
+    """
+    Remove as respostas de progresso cacheadas de um usuário neste processo.
+
+    A versão na chave já garante a consistência entre workers; a remoção apenas
+    libera as entradas que não serão mais lidas. O progresso bruto cacheado por
+    get_user_progress não é versionado e é descartado aqui, assim como o
+    documento do usuário cacheado por get_current_user.
+    """
+    prefix = f"progress:{user_id}:"
+    for key in [key for key in progress_cache.cache.keys() if key.startswith(prefix)]:
+        del progress_cache.cache[key]
+
+    user_progress_cache.cache.pop(user_id, None)
+    invalidate_user_cache(user_id)
+
+
+def invalidate_user_cache(user_id: str):
+    """
+    Remove o documento do usuário cacheado por get_current_user neste processo.
+
+    Deve ser chamada após escritas no documento do usuário; em outros workers a
+    entrada expira pelo TTL curto.
+    """
+    current_user_cache.cache.pop(user_id, None)
+
+
 def invalidate_cache(cache_type: str = "all", pattern: Optional[str] = None):
     """
     Invalida entradas do cache.
 
     Args:
-        cache_type: Tipo de cache ("llm", "content", "user", "all")
+        cache_type: Tipo de cache ("llm", "content", "user", "progress", "generated_content",
+            "learning_path", "next_content", "user_progress", "current_user", "all")
         pattern: Padrão para invalidação seletiva (opcional)
     """
     caches = {
         "llm": llm_cache,
         "content": content_cache,
-        "user": user_cache
+        "user": user_cache,
+        "progress": progress_cache,
+        "generated_content": generated_content_cache,
+        "learning_path": learning_path_cache,
+        "next_content": next_content_cache,
+        "user_progress": user_progress_cache,
+        "current_user": current_user_cache
     }
 
     if cache_type == "all":
@@ -246,7 +315,13 @@ async def get_cache_stats(
     return {
         "llm_cache": llm_cache.get_stats(),
         "content_cache": content_cache.get_stats(),
-        "user_cache": user_cache.get_stats()
+        "user_cache": user_cache.get_stats(),
+        "progress_cache": progress_cache.get_stats(),
+        "generated_content_cache": generated_content_cache.get_stats(),
+        "learning_path_cache": learning_path_cache.get_stats(),
+        "next_content_cache": next_content_cache.get_stats(),
+        "user_progress_cache": user_progress_cache.get_stats(),
+        "current_user_cache": current_user_cache.get_stats()
     }
 
 
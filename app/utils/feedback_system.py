@@ -26,14 +26,15 @@ def collect_user_feedback(db: Any, user_id: str, content_type: str,
         True se o feedback foi salvo com sucesso
     """
     try:
+        now = time.time()
         feedback_data = {
             "user_id": user_id,
             "content_type": content_type,
             "rating": rating,
             "comments": comments,
             "context": context or {},
-            "timestamp": time.time(),
-            "date": time.strftime("%Y-%m-%d")
+            "timestamp": now,
+            "date": time.strftime("%Y-%m-%d", time.localtime(now))
         }
 
         db.collection("user_feedback").add(feedback_data)
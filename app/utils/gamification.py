@@ -1,18 +1,45 @@
 # app/utils/gamification.py
 from typing import Dict, Any, Optional, List
-from google.cloud.firestore import ArrayUnion
+from google.cloud.firestore import ArrayUnion, FieldPath, Increment
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import chain
+import asyncio
 import time
 
 from app.config import get_settings
 from app.database import Collections
+from app.utils.cache_system import invalidate_user_cache
 
 settings = get_settings()
 
+# Versão do esquema de "stats"; documentos com versão menor recebem novo backfill
+# (a versão 7 copia também os projetos concluídos para a subcoleção; a 8
+# deriva o XP de cada dia em daily_stats)
+PROGRESS_STATS_VERSION = 8
+
+# A partir desta versão as conclusões legadas já foram copiadas para as subcoleções
+# (a versão 5 refaz a cópia com os ids de documento em BLAKE2b)
+COMPLETIONS_MIGRATED_VERSION = 5
+
+# Contadores diários em daily_stats.{YYYY-MM-DD} e o array/campo de data de onde
+# cada um é derivado no backfill
+DAILY_STATS_SOURCES = {
+    "lessons": ("completed_lessons", "completion_date"),
+    "modules": ("completed_modules", "completion_date"),
+    "projects_started": ("started_projects", "start_date"),
+    "projects_completed": ("completed_projects", "completion_date"),
+}
+
+# XP ganho no dia, também em daily_stats.{YYYY-MM-DD} (somado a cada add_user_xp)
+DAILY_XP_COUNTER = "xp"
+
 
 def initialize_user_gamification() -> Dict[str, Any]:
     """
     Inicializa dados de gamificação para novo usuário
     """
+    now = time.time()
     return {
         "profile_xp": 0,
         "profile_level": 1,
@@ -20,8 +47,9 @@ def initialize_user_gamification() -> Dict[str, Any]:
         "xp_history": [{
             "amount": 10,
             "reason": "Criação de conta",
-            "timestamp": time.time()
+            "timestamp": now
         }],
+        "daily_stats": {date.fromtimestamp(now).isoformat(): {DAILY_XP_COUNTER: 10}},
         "started_projects": [],
         "completed_projects": [],
         "completed_lessons": [],
@@ -35,7 +63,20 @@ def initialize_user_gamification() -> Dict[str, Any]:
         "specializations_started": [],
         "accessed_resources": [],
         "mapping_history": [],
-        "track_scores": {}
+        "track_scores": {},
+        "strongest_area": None,
+        "study_streak": 0,
+        "last_study_date": None,
+        "stats": {
+            "completed_lessons_count": 0,
+            "completed_modules_count": 0,
+            "completed_levels_count": 0,
+            "completed_projects_count": 0,
+            "certifications_count": 0,
+            "active_projects_count": 0,
+            "initialized": True,
+            "version": PROGRESS_STATS_VERSION
+        }
     }
 
 
@@ -59,15 +100,23 @@ def calculate_user_level(xp: int) -> int:
     return level
 
 
-def add_user_xp(db, user_id: str, amount: int, reason: str) -> Dict[str, Any]:
+def add_user_xp(db, user_id: str, amount: int, reason: str, batch=None) -> Dict[str, Any]:
     """
     Adiciona XP ao usuário e atualiza seu nível
 
+    Lê apenas XP, nível e badges; o XP é gravado com Increment, então adições
+    concorrentes (em batches diferentes) não se sobrescrevem. O XP do dia é
+    somado em daily_stats, para /today e /weekly não percorrerem xp_history.
+
+    Args:
+        batch: WriteBatch (ou coletor compatível) que recebe a escrita em vez de
+            gravá-la imediatamente
+
     Returns:
         Dict com new_xp, new_level, level_up (bool)
     """
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
+    user_doc = user_ref.get(field_paths=["profile_xp", "profile_level", "badges"])
 
     if not user_doc.exists:
         raise ValueError(f"User {user_id} not found")
@@ -86,14 +135,16 @@ def add_user_xp(db, user_id: str, amount: int, reason: str) -> Dict[str, Any]:
     level_up = new_level > current_level
 
     # Preparar atualizações
+    now = time.time()
     updates = {
-        "profile_xp": new_xp,
+        "profile_xp": Increment(amount),
         "profile_level": new_level,
         "xp_history": ArrayUnion([{
             "amount": amount,
             "reason": reason,
-            "timestamp": time.time()
-        }])
+            "timestamp": now
+        }]),
+        **build_daily_stats_update(date.fromtimestamp(now).isoformat(), **{DAILY_XP_COUNTER: amount})
     }
 
     # Se houve level up, adicionar badge de nível
@@ -103,7 +154,11 @@ def add_user_xp(db, user_id: str, amount: int, reason: str) -> Dict[str, Any]:
             updates["badges"] = ArrayUnion([level_badge])
 
     # Atualizar no banco
-    user_ref.update(updates)
+    if batch is not None:
+        batch.update(user_ref, updates)
+    else:
+        user_ref.update(updates)
+        invalidate_user_cache(user_id)
 
     return {
         "new_xp": new_xp,
@@ -113,15 +168,19 @@ def add_user_xp(db, user_id: str, amount: int, reason: str) -> Dict[str, Any]:
     }
 
 
-def grant_badge(db, user_id: str, badge_name: str) -> bool:
+def grant_badge(db, user_id: str, badge_name: str, batch=None) -> bool:
     """
     Concede uma badge ao usuário
 
+    Args:
+        batch: WriteBatch (ou coletor compatível) que recebe a escrita em vez de
+            gravá-la imediatamente
+
     Returns:
         True se a badge foi concedida, False se já possuía
     """
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
+    user_doc = user_ref.get(field_paths=["badges"])
 
     if not user_doc.exists:
         raise ValueError(f"User {user_id} not found")
@@ -134,13 +193,31 @@ def grant_badge(db, user_id: str, badge_name: str) -> bool:
         return False
 
     # Adicionar a badge
-    user_ref.update({
-        "badges": ArrayUnion([badge_name])
-    })
+    badge_update = {"badges": ArrayUnion([badge_name])}
+    if batch is not None:
+        batch.update(user_ref, badge_update)
+    else:
+        user_ref.update(badge_update)
+        invalidate_user_cache(user_id)
 
     return True
 
 
+async def add_user_xp_async(db, user_id: str, amount: int, reason: str, batch=None) -> Dict[str, Any]:
+    """
+    Versão awaitable de add_user_xp: executa as chamadas bloqueantes do Firestore
+    em uma thread para não travar o event loop
+    """
+    return await asyncio.to_thread(add_user_xp, db, user_id, amount, reason, batch)
+
+
+async def grant_badge_async(db, user_id: str, badge_name: str, batch=None) -> bool:
+    """
+    Versão awaitable de grant_badge
+    """
+    return await asyncio.to_thread(grant_badge, db, user_id, badge_name, batch)
+
+
 def check_achievement_criteria(user_data: Dict[str, Any]) -> List[str]:
     """
     Verifica critérios para desbloqueio automático de conquistas
@@ -213,6 +290,29 @@ def get_next_level_info(current_xp: int, current_level: int) -> Dict[str, Any]:
     }
 
 
+@lru_cache(maxsize=4096)
+def date_to_timestamp(day: str) -> float:
+    """
+    Converte uma data "YYYY-MM-DD" no timestamp da meia-noite local
+
+    Equivale a time.mktime(time.strptime(day, "%Y-%m-%d")) sem o custo do
+    strptime; as datas dos históricos se repetem muito, então o resultado é
+    memorizado.
+
+    Raises:
+        ValueError: Se a data for inválida
+    """
+    year, month, day_of_month = (int(part) for part in day.split("-"))
+    return time.mktime(date(year, month, day_of_month).timetuple())
+
+
+def previous_day(day: str) -> str:
+    """
+    Obtém a data ("YYYY-MM-DD") do dia anterior, sem depender de horário de verão
+    """
+    return (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+
+
 def calculate_study_streak(user_data: Dict[str, Any]) -> int:
     """
     Calcula a sequência de dias de estudo do usuário
@@ -237,14 +337,14 @@ def calculate_study_streak(user_data: Dict[str, Any]) -> int:
     activity_dates = set()
 
     for lesson in completed_lessons:
-        date = lesson.get("completion_date")
-        if date:
-            activity_dates.add(date)
+        completion_date = lesson.get("completion_date")
+        if completion_date:
+            activity_dates.add(completion_date)
 
     for module in completed_modules:
-        date = module.get("completion_date")
-        if date:
-            activity_dates.add(date)
+        completion_date = module.get("completion_date")
+        if completion_date:
+            activity_dates.add(completion_date)
 
     # Ordenar datas
     sorted_dates = sorted(activity_dates, reverse=True)
@@ -254,7 +354,7 @@ def calculate_study_streak(user_data: Dict[str, Any]) -> int:
 
     # Contar dias consecutivos
     streak = 1
-    today = time.strftime("%Y-%m-%d")
+    today = time.strftime("%Y-%m-%d", time.localtime(current_time))
 
     # Se hoje está nas datas, começar de hoje
     if today in sorted_dates:
@@ -269,9 +369,7 @@ def calculate_study_streak(user_data: Dict[str, Any]) -> int:
 
     # Contar dias consecutivos para trás
     for i in range(1, len(sorted_dates)):
-        prev_date = time.strftime("%Y-%m-%d", time.localtime(
-            time.mktime(time.strptime(current_date, "%Y-%m-%d")) - 24 * 60 * 60
-        ))
+        prev_date = previous_day(current_date)
 
         if prev_date in sorted_dates:
             streak += 1
@@ -282,6 +380,121 @@ def calculate_study_streak(user_data: Dict[str, Any]) -> int:
     return streak
 
 
+def build_study_streak_update(user_data: Dict[str, Any], today: str) -> Dict[str, Any]:
+    """
+    Calcula a atualização da sequência armazenada ao registrar uma atividade de estudo
+
+    Returns:
+        Dict com study_streak e last_study_date, ou vazio se já houve atividade hoje
+    """
+    last_study_date = user_data.get("last_study_date")
+    if last_study_date == today:
+        return {}
+
+    yesterday = previous_day(today)
+
+    if last_study_date == yesterday:
+        streak = user_data.get("study_streak", 0) + 1
+    else:
+        streak = 1
+
+    return {
+        "study_streak": streak,
+        "last_study_date": today
+    }
+
+
+def get_stored_study_streak(user_data: Dict[str, Any], today: Optional[str] = None) -> int:
+    """
+    Lê a sequência armazenada, que só é válida se a última atividade foi hoje ou ontem
+
+    Args:
+        today: Data de hoje ("YYYY-MM-DD") já calculada pela requisição
+    """
+    last_study_date = user_data.get("last_study_date")
+    if not last_study_date:
+        return 0
+
+    if today is None:
+        today = date.today().isoformat()
+
+    if last_study_date not in (today, previous_day(today)):
+        return 0
+
+    return user_data.get("study_streak", 0)
+
+
+def build_daily_stats_update(day: str, **increments: int) -> Dict[str, Any]:
+    """
+    Incrementa os contadores do dia em daily_stats (ex.: lessons=1)
+
+    A data contém "-", então o caminho do campo é montado com FieldPath.
+    """
+    return {
+        FieldPath("daily_stats", day, counter).to_api_repr(): Increment(amount)
+        for counter, amount in increments.items()
+    }
+
+
+def build_daily_stats(user_data: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """
+    Deriva daily_stats dos arrays de histórico (backfill único)
+    """
+    daily_stats: Dict[str, Dict[str, int]] = {}
+    for counter, (field, date_field) in DAILY_STATS_SOURCES.items():
+        for item in user_data.get(field, []):
+            day = item.get(date_field)
+            if day:
+                day_stats = daily_stats.setdefault(day, {})
+                day_stats[counter] = day_stats.get(counter, 0) + 1
+
+    for entry in user_data.get("xp_history", []):
+        timestamp = entry.get("timestamp")
+        if timestamp:
+            day_stats = daily_stats.setdefault(date.fromtimestamp(timestamp).isoformat(), {})
+            day_stats[DAILY_XP_COUNTER] = day_stats.get(DAILY_XP_COUNTER, 0) + entry.get("amount", 0)
+
+    return daily_stats
+
+
+def get_daily_stats(user_data: Dict[str, Any], day: str) -> Dict[str, int]:
+    """
+    Obtém os contadores de um dia ("YYYY-MM-DD"); dias sem atividade retornam zeros
+    """
+    day_stats = (user_data.get("daily_stats") or {}).get(day) or {}
+    return {counter: day_stats.get(counter, 0) for counter in chain(DAILY_STATS_SOURCES, (DAILY_XP_COUNTER,))}
+
+
+def get_last_study_date(user_data: Dict[str, Any]) -> Optional[str]:
+    """
+    Obtém a data da última lição ou módulo concluído a partir dos arrays de histórico
+    """
+    dates = [
+        item.get("completion_date")
+        for item in user_data.get("completed_lessons", []) + user_data.get("completed_modules", [])
+        if item.get("completion_date")
+    ]
+    return max(dates) if dates else None
+
+
+def completions_migrated(user_data: Dict[str, Any]) -> bool:
+    """
+    Indica se todas as conclusões do usuário estão nas subcoleções, permitindo
+    que a checagem de duplicata dispense a varredura dos arrays legados
+    """
+    return (user_data.get("stats") or {}).get("version", 0) >= COMPLETIONS_MIGRATED_VERSION
+
+
+def get_strongest_area(track_scores: Optional[Dict[str, float]]) -> Optional[str]:
+    """
+    Obtém a área com maior pontuação, armazenada junto de track_scores
+    """
+    if not track_scores:
+        return None
+
+    return max(track_scores.items(), key=lambda x: x[1])[0]
+
+
 def get_level_progress(current_xp: int, current_level: int) -> dict:
     """
     Calcula o progresso detalhado do nível
@@ -0,0 +1,253 @@
+# app/utils/llm_cache.py
+import hashlib
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists
+from google.cloud.firestore import transactional
+
+from app.database import Collections
+from app.utils.cache_system import generated_content_cache
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando o currículo ou os prompts mudarem para invalidar o cache persistido
+CONTENT_CACHE_VERSION = 1
+
+# Tempo (s) após o qual um job de geração pendente é considerado abandonado
+CONTENT_JOB_TIMEOUT = 300
+
+# Máximo de gerações especulativas (conteúdo seguinte) simultâneas por processo
+PREFETCH_CONCURRENCY = 4
+_prefetch_slots = threading.BoundedSemaphore(PREFETCH_CONCURRENCY)
+
+# Faixas etárias usadas na chave: conteúdo de idades próximas é equivalente
+AGE_BUCKETS = [
+    (12, "10-12"),
+    (15, "13-15"),
+    (18, "16-18"),
+]
+ADULT_AGE_BUCKET = "19+"
+
+
+def get_age_bucket(age: Any) -> str:
+    """
+    Agrupa a idade do estudante em faixas para aumentar a taxa de acerto do cache
+    """
+    if not isinstance(age, int):
+        return "default"
+
+    for max_age, bucket in AGE_BUCKETS:
+        if age <= max_age:
+            return bucket
+
+    return ADULT_AGE_BUCKET
+
+
+def build_content_cache_key(
+        area: str,
+        subarea: str,
+        level: str,
+        module_index: int,
+        lesson_index: int,
+        step_index: Optional[int],
+        age: Any,
+        teaching_style: str,
+        source_text: str
+) -> str:
+    """
+    Gera a chave do conteúdo expandido de um passo (ou da lição completa quando
+    step_index é None)
+
+    source_text é o texto do currículo usado no prompt (passo ou título da lição);
+    seu hash faz edições no currículo gerarem novo conteúdo automaticamente.
+    """
+    step = "lesson" if step_index is None else step_index
+    source_hash = hashlib.sha1((source_text or "").encode("utf-8")).hexdigest()[:12]
+    raw_key = (
+        f"v{CONTENT_CACHE_VERSION}|{area}|{subarea}|{level}|{module_index}|{lesson_index}|"
+        f"{step}|{get_age_bucket(age)}|{teaching_style}|{source_hash}"
+    )
+    return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()
+
+
+def get_cached_content(db, cache_key: str) -> Optional[str]:
+    """
+    Busca conteúdo gerado no cache em memória e, em seguida, no Firestore
+    """
+    content = generated_content_cache.get(cache_key)
+    if content is not None:
+        return content
+
+    try:
+        doc = db.collection(Collections.GENERATED_CONTENT).document(cache_key).get()
+    except Exception as e:
+        logger.error(f"Erro ao ler conteúdo cacheado {cache_key}: {e}")
+        return None
+
+    if not doc.exists:
+        return None
+
+    content = doc.to_dict().get("content")
+    if content is not None:
+        generated_content_cache.set(cache_key, content)
+
+    return content
+
+
+def store_cached_content(db, cache_key: str, content: str, metadata: Dict[str, Any]):
+    """
+    Armazena conteúdo gerado no cache em memória e no Firestore
+    """
+    generated_content_cache.set(cache_key, content)
+
+    try:
+        db.collection(Collections.GENERATED_CONTENT).document(cache_key).set({
+            **metadata,
+            "content": content,
+            "version": CONTENT_CACHE_VERSION,
+            "created_at": time.time()
+        })
+    except Exception as e:
+        logger.error(f"Erro ao salvar conteúdo cacheado {cache_key}: {e}")
+
+
+class ContentStream:
+    """
+    Texto parcial de um job em geração neste processo
+
+    O job (em uma thread de BackgroundTasks) acrescenta os trechos e quem
+    transmite a resposta lê a lista a partir do último índice enviado.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+
+    def append(self, delta: str):
+        self.chunks.append(delta)
+
+
+# Jobs em geração neste processo, por job_id
+_content_streams: Dict[str, ContentStream] = {}
+
+
+def get_content_stream(job_id: str) -> Optional[ContentStream]:
+    """
+    Obtém o texto parcial de um job, se ele estiver sendo gerado neste processo
+    """
+    return _content_streams.get(job_id)
+
+
+def get_content_job(db, job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Obtém o estado de um job de geração de conteúdo
+    """
+    doc = db.collection(Collections.CONTENT_JOBS).document(job_id).get()
+    return doc.to_dict() if doc.exists else None
+
+
+@transactional
+def _take_over_content_job(transaction, job_ref) -> bool:
+    snapshot = job_ref.get(transaction=transaction)
+    job = snapshot.to_dict() if snapshot.exists else None
+    if job and job.get("status") == "pending" and time.time() - job.get("created_at", 0) < CONTENT_JOB_TIMEOUT:
+        return False
+
+    transaction.set(job_ref, {"status": "pending", "created_at": time.time()})
+    return True
+
+
+def claim_content_job(db, job_id: str) -> bool:
+    """
+    Registra um job de geração pendente
+
+    create() falha no servidor se o job já existir, então apenas um worker
+    vence a corrida. Um job existente (concluído, com falha ou pendente há mais
+    de CONTENT_JOB_TIMEOUT) é retomado em uma transação, que relê o estado
+    antes de gravar.
+
+    Returns:
+        False se outro worker já está gerando o mesmo conteúdo
+    """
+    job_ref = db.collection(Collections.CONTENT_JOBS).document(job_id)
+
+    try:
+        job_ref.create({"status": "pending", "created_at": time.time()})
+    except AlreadyExists:
+        return _take_over_content_job(db.transaction(), job_ref)
+
+    return True
+
+
+def run_content_job(
+        db,
+        job_id: str,
+        generator: Callable[..., Tuple[str, bool]],
+        metadata: Dict[str, Any]
+):
+    """
+    Executa a geração de conteúdo fora do ciclo da requisição
+
+    O job_id é a própria chave do cache: quando o conteúdo é cacheável, o
+    resultado fica disponível em get_cached_content. Conteúdo de erro/fallback
+    não é cacheado e fica registrado apenas no job. Durante a geração, os
+    trechos recebidos ficam em get_content_stream(job_id); o stream só é
+    marcado como concluído depois que o resultado foi gravado.
+
+    Args:
+        generator: Função que retorna (conteúdo, cacheável) e recebe on_delta
+            para repassar trechos parciais
+    """
+    job_ref = db.collection(Collections.CONTENT_JOBS).document(job_id)
+    stream = ContentStream()
+    _content_streams[job_id] = stream
+
+    try:
+        try:
+            content, cacheable = generator(on_delta=stream.append)
+        except Exception as e:
+            logger.error(f"Erro ao gerar conteúdo do job {job_id}: {e}")
+            job_ref.set({"status": "failed", "error": str(e), "finished_at": time.time()}, merge=True)
+            return
+
+        if cacheable:
+            store_cached_content(db, job_id, content, metadata)
+            job_ref.set({"status": "ready", "finished_at": time.time()}, merge=True)
+        else:
+            job_ref.set({"status": "failed", "content": content, "finished_at": time.time()}, merge=True)
+    finally:
+        stream.done = True
+        _content_streams.pop(job_id, None)
+
+
+def acquire_prefetch_slot() -> bool:
+    """
+    Reserva uma vaga para geração especulativa sem bloquear
+
+    Returns:
+        False se já há PREFETCH_CONCURRENCY gerações especulativas em andamento
+    """
+    return _prefetch_slots.acquire(blocking=False)
+
+
+def release_prefetch_slot():
+    _prefetch_slots.release()
+
+
+def run_prefetch_job(
+        db,
+        job_id: str,
+        generator: Callable[..., Tuple[str, bool]],
+        metadata: Dict[str, Any]
+):
+    """
+    run_content_job para gerações especulativas: libera a vaga reservada em
+    acquire_prefetch_slot ao terminar
+    """
+    try:
+        run_content_job(db, job_id, generator, metadata)
+    finally:
+        release_prefetch_slot()
@@ -3,7 +3,7 @@ import os
 import json
 import time
 import hashlib
-from typing import Dict, List, Optional, Union, Any
+from typing import Callable, Dict, List, Optional, Union, Any
 from collections import OrderedDict
 from openai import OpenAI
 import logging
@@ -66,6 +66,9 @@ _response_cache = LRUCache(max_size=1000)
 # Tempo máximo de cache (24 horas)
 CACHE_TTL = 24 * 60 * 60  # em segundos
 
+# Prefixo das respostas de fallback quando a chamada à API falha
+LLM_ERROR_PREFIX = "Ocorreu um erro ao gerar o conteúdo."
+
 
 class LessonContent:
     """Classe para estruturar o conteúdo de uma aula"""
@@ -76,13 +79,16 @@ class LessonContent:
                  main_content: List[Dict[str, str]],
                  examples: List[Dict[str, str]],
                  activities: List[Dict[str, str]],
-                 summary: str):
+                 summary: str,
+                 is_fallback: bool = False):
         self.title = title
         self.introduction = introduction
         self.main_content = main_content
         self.examples = examples
         self.activities = activities
         self.summary = summary
+        # Indica aula genérica gerada após falha da API (não deve ser cacheada)
+        self.is_fallback = is_fallback
 
     def to_dict(self) -> Dict[str, Any]:
         """Converte a aula para dicionário"""
@@ -154,7 +160,8 @@ def call_teacher_llm(user_content: str,
                      model: str = "default",
                      max_tokens: int = 1500,
                      user_id: str = None,
-                     use_cache: bool = True) -> str:
+                     use_cache: bool = True,
+                     on_delta: Optional[Callable[[str], None]] = None) -> str:
     """
     Chama a API da OpenAI para gerar conteúdo pedagógico adaptado.
 
@@ -169,6 +176,8 @@ def call_teacher_llm(user_content: str,
         max_tokens: Limite máximo de tokens na resposta
         user_id: ID do usuário para personalização contínua
         use_cache: Se deve usar cache para respostas anteriores
+        on_delta: Se informado, a resposta é pedida em streaming e cada trecho
+            é repassado a esta função à medida que chega
 
     Returns:
         Conteúdo educacional gerado
@@ -260,13 +269,28 @@ def call_teacher_llm(user_content: str,
 
     # Realizar a chamada à API
     try:
-        response = client.chat.completions.create(
-            model=selected_model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        content = response.choices[0].message.content
+        if on_delta is None:
+            response = client.chat.completions.create(
+                model=selected_model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            content = response.choices[0].message.content
+        else:
+            parts = []
+            for chunk in client.chat.completions.create(
+                    model=selected_model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+            ):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+            content = "".join(parts)
 
         # Guardar no cache se habilitado
         if use_cache:
@@ -275,7 +299,7 @@ def call_teacher_llm(user_content: str,
         return content
     except Exception as e:
         print(f"Erro ao chamar a API: {e}")
-        return f"Ocorreu um erro ao gerar o conteúdo. Por favor, tente novamente mais tarde. Detalhes: {str(e)[:100]}..."
+        return f"{LLM_ERROR_PREFIX} Por favor, tente novamente mais tarde. Detalhes: {str(e)[:100]}..."
 
 
 def generate_complete_lesson(topic: str,
@@ -364,7 +388,8 @@ def generate_complete_lesson(topic: str,
             main_content=[{"subtitle": "Conceitos básicos", "content": "Conteúdo não disponível devido a um erro."}],
             examples=[],
             activities=[],
-            summary=f"Não foi possível gerar o resumo para {topic}."
+            summary=f"Não foi possível gerar o resumo para {topic}.",
+            is_fallback=True
         )
 
 
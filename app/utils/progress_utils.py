@@ -1,24 +1,370 @@
 # app/utils/progress_utils.py
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set
+import asyncio
+import hashlib
 import time
+from google.api_core.exceptions import AlreadyExists
+from google.cloud.firestore import SERVER_TIMESTAMP, FieldFilter, FieldPath, transactional
 from app.database import Collections
+from app.utils.cache_system import learning_path_cache, user_progress_cache
+from app.utils.write_coalescer import MAX_BATCH_OPS
+
+# Sequência de níveis do currículo e posição de cada um (busca O(1))
+LEVELS_ORDER = ("iniciante", "intermediário", "avançado")
+LEVEL_INDEX = {level: index for index, level in enumerate(LEVELS_ORDER)}
+
+# Planos de estudo gerados (analytics) são gravados em learning_paths com este
+# prefixo de id e não são áreas do currículo
+STUDY_PLAN_ID_PREFIX = "path_"
+
+
+def build_area_index(area_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Indexa o currículo de uma área por posição para buscas O(1) sem exceções
+
+    Chaves das tabelas:
+        subareas: tupla com as subáreas da área, na ordem do documento
+        subarea_index: subárea -> posição em subareas
+        subareas_ci: nome da subárea em minúsculas -> nome no documento
+        levels_ci: subárea -> {nome do nível em minúsculas -> nome no documento}
+        modules: (subárea, nível, módulo)
+        lessons: (subárea, nível, módulo, lição)
+        steps: (subárea, nível, módulo, lição, passo)
+        sizes: quantidade de filhos de cada prefixo acima, e (subárea, nível)
+            para o número de módulos
+        lessons_before: (subárea, nível, módulo) -> lições dos módulos anteriores
+        level_lessons: (subárea, nível) -> total de lições do nível
+    """
+    subareas = tuple(area_data.get("subareas", {}))
+    modules_index = {}
+    lessons_index = {}
+    steps_index = {}
+    sizes = {}
+    lessons_before = {}
+    level_lessons = {}
+    levels_ci = {}
+
+    for subarea, subarea_data in area_data.get("subareas", {}).items():
+        levels_ci[subarea] = {level.lower(): level for level in subarea_data.get("levels", {})}
+
+        for level, level_data in subarea_data.get("levels", {}).items():
+            modules = level_data.get("modules", [])
+            sizes[(subarea, level)] = len(modules)
+            lesson_total = 0
+
+            for module_idx, module_data in enumerate(modules):
+                lessons = module_data.get("lessons", [])
+                modules_index[(subarea, level, module_idx)] = module_data
+                sizes[(subarea, level, module_idx)] = len(lessons)
+                lessons_before[(subarea, level, module_idx)] = lesson_total
+                lesson_total += len(lessons)
+
+                for lesson_idx, lesson_data in enumerate(lessons):
+                    steps = lesson_data.get("steps") or []
+                    lessons_index[(subarea, level, module_idx, lesson_idx)] = lesson_data
+                    sizes[(subarea, level, module_idx, lesson_idx)] = len(steps)
+
+                    for step_idx, step in enumerate(steps):
+                        steps_index[(subarea, level, module_idx, lesson_idx, step_idx)] = step
+
+            level_lessons[(subarea, level)] = lesson_total
+
+    return {
+        "data": area_data,
+        "subareas": subareas,
+        "subarea_index": {subarea: index for index, subarea in enumerate(subareas)},
+        "subareas_ci": {subarea.lower(): subarea for subarea in subareas},
+        "levels_ci": levels_ci,
+        "modules": modules_index,
+        "lessons": lessons_index,
+        "steps": steps_index,
+        "sizes": sizes,
+        "lessons_before": lessons_before,
+        "level_lessons": level_lessons
+    }
+
+
+def get_area_data(db, area: str) -> Optional[Dict[str, Any]]:
+    """
+    Obtém o currículo da área já indexado, com cache em memória
+
+    O currículo é estático entre publicações, então o documento e o índice são
+    compartilhados entre requisições durante o TTL do cache; quem os recebe não
+    deve modificá-los.
+
+    Returns:
+        Índice de build_area_index ou None se a área não existir
+    """
+    cache_key = f"area:{area}"
+    index = learning_path_cache.get(cache_key)
+    if index is not None:
+        return index
+
+    area_doc = db.collection(Collections.LEARNING_PATHS).document(area).get()
+    if not area_doc.exists:
+        return None
+
+    index = build_area_index(area_doc.to_dict())
+    learning_path_cache.set(cache_key, index)
+    return index
+
+
+def get_areas_data(db, areas: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Obtém os currículos indexados de várias áreas
+
+    As áreas ausentes do cache são lidas juntas com get_all (uma única chamada
+    BatchGetDocuments) em vez de um get() por área.
+
+    Returns:
+        Área -> índice de build_area_index, apenas para as áreas existentes
+    """
+    indexes = {}
+    missing_refs = []
+    for area in areas:
+        index = learning_path_cache.get(f"area:{area}")
+        if index is not None:
+            indexes[area] = index
+        else:
+            missing_refs.append(db.collection(Collections.LEARNING_PATHS).document(area))
+
+    if missing_refs:
+        for area_doc in db.get_all(missing_refs):
+            if not area_doc.exists:
+                continue
+
+            index = build_area_index(area_doc.to_dict())
+            learning_path_cache.set(f"area:{area_doc.id}", index)
+            indexes[area_doc.id] = index
+
+    return indexes
+
+
+def get_area_ids(db) -> List[str]:
+    """
+    Lista os ids das áreas de aprendizado, com cache em memória
+
+    Os planos de estudo gerados compartilham a coleção e são ignorados; por
+    isso gravá-los não exige invalidar este cache.
+    """
+    area_ids = learning_path_cache.get("areas")
+    if area_ids is not None:
+        return area_ids
+
+    # Máscara vazia: a consulta retorna apenas os ids, sem o currículo de cada área
+    area_docs = db.collection(Collections.LEARNING_PATHS).select([]).stream()
+    area_ids = [area_doc.id for area_doc in area_docs if not area_doc.id.startswith(STUDY_PLAN_ID_PREFIX)]
+    learning_path_cache.set("areas", area_ids)
+    return area_ids
+
+
+def build_completion_id(*parts: Optional[str]) -> str:
+    """
+    Gera o id compacto (32 caracteres hex) de uma conclusão a partir dos nomes
+    de área, subárea, nível, módulo e lição
+
+    O hash é feito sobre o id legado ("area_subarea_..."), então
+    build_completion_id(...) == hash_completion_id(id_legado) e os registros
+    antigos dos arrays mapeiam para o mesmo documento da subcoleção.
+    """
+    return hash_completion_id(build_legacy_completion_id(*parts))
+
+
+def build_legacy_completion_id(*parts: Optional[str]) -> str:
+    """
+    Id legível usado antes dos ids compactos (ainda presente nos arrays antigos)
+    """
+    return "_".join(str(part) for part in parts)
+
+
+def hash_completion_id(record_id: str) -> str:
+    return hashlib.blake2b(record_id.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def is_completion_hash(record_id: str) -> bool:
+    # Ids legados sempre contêm "_", então nunca são 32 caracteres hex
+    return len(record_id) == 32 and all(char in "0123456789abcdef" for char in record_id)
+
+
+def _completion_ref(db, user_id: str, subcollection: str, record_id: str):
+    # Ids legados contêm títulos livres (podem ter "/"), então usamos o hash
+    doc_id = record_id if is_completion_hash(record_id) else hash_completion_id(record_id)
+    return db.collection(Collections.USERS).document(user_id).collection(subcollection).document(doc_id)
+
+
+def claim_completion(db, user_id: str, subcollection: str, record_id: str, record: Dict[str, Any]) -> bool:
+    """
+    Registra uma conclusão na subcoleção users/{user_id}/{subcollection}
+
+    create() falha no servidor se o documento já existir, então a checagem de
+    duplicata é O(1) e segura entre requisições concorrentes.
+
+    Returns:
+        False se a conclusão já estava registrada
+    """
+    try:
+        _completion_ref(db, user_id, subcollection, record_id).create(record)
+    except AlreadyExists:
+        return False
+
+    return True
+
+
+def get_completion_id(subcollection: str, record: Dict[str, Any]) -> Optional[str]:
+    """
+    Obtém o id de uma conclusão registrada nos arrays do documento do usuário
+
+    Registros antigos de nível não possuem level_id e o id é derivado dos campos.
+    Projetos não têm id próprio: cada execução é identificada pelo tipo, título
+    e início.
+    """
+    if subcollection == Collections.COMPLETED_PROJECTS:
+        return build_legacy_completion_id(
+            record.get("type"), record.get("title"), record.get("start_timestamp") or record.get("start_date")
+        )
+
+    if subcollection == Collections.COMPLETED_LEVELS:
+        return record.get("level_id") or f"{record.get('area')}_{record.get('subarea')}_{record.get('level')}"
+
+    if subcollection == Collections.COMPLETED_MODULES:
+        return record.get("module_id")
+
+    return record.get("lesson_id")
+
+
+def backfill_completions(db, user_id: str, user_data: Dict[str, Any]):
+    """
+    Copia as conclusões dos arrays legados para as subcoleções (uma única vez)
+
+    Os arrays têm o mesmo nome das subcoleções; set() torna a cópia idempotente.
+    """
+    batch = db.batch()
+    pending_ops = 0
+
+    for subcollection in (
+            Collections.COMPLETED_LESSONS,
+            Collections.COMPLETED_MODULES,
+            Collections.COMPLETED_LEVELS,
+            Collections.COMPLETED_PROJECTS
+    ):
+        for record in user_data.get(subcollection, []):
+            record_id = get_completion_id(subcollection, record)
+            if not record_id:
+                continue
+
+            batch.set(_completion_ref(db, user_id, subcollection, record_id), record)
+            pending_ops += 1
+
+            if pending_ops >= MAX_BATCH_OPS:
+                batch.commit()
+                batch = db.batch()
+                pending_ops = 0
+
+    if pending_ops:
+        batch.commit()
+
+
+def get_specialization_names(db, user_id: str, subcollection: str, user_data: Dict[str, Any]) -> Set[str]:
+    """
+    Obtém os nomes das especializações registradas em uma subcoleção do usuário
+    (iniciadas ou concluídas)
+
+    As especializações ficam em subcoleções para não crescer o documento do
+    usuário; registros antigos ainda podem estar no array de mesmo nome.
+    """
+    names = {record.get("name") for record in user_data.get(subcollection, [])}
+    records = (
+        db.collection(Collections.USERS).document(user_id)
+        .collection(subcollection).select(["name"]).stream()
+    )
+    names.update(record.get("name") for record in records)
+    return names
+
+
+def get_last_completion_date(db, user_id: str, subcollection: str, area: str, subarea: str) -> Optional[str]:
+    """
+    Obtém a data ("YYYY-MM-DD") da conclusão mais recente de uma área/subárea
+
+    Consulta indexada (area, subarea, completion_date DESC) com limit(1), em vez
+    de percorrer o histórico inteiro.
+    """
+    records = (
+        db.collection(Collections.USERS).document(user_id).collection(subcollection)
+        .where(filter=FieldFilter("area", "==", area))
+        .where(filter=FieldFilter("subarea", "==", subarea))
+        .order_by("completion_date", direction="DESCENDING")
+        .select(["completion_date"])
+        .limit(1)
+        .stream()
+    )
+    for record in records:
+        return record.get("completion_date")
+
+    return None
+
+
+def release_completion(db, user_id: str, subcollection: str, record_id: str):
+    """
+    Remove uma conclusão registrada por claim_completion (quando a gravação
+    principal falha e a requisição precisa poder ser repetida)
+    """
+    _completion_ref(db, user_id, subcollection, record_id).delete()
+
+
+# Campos de progress.current que identificam a posição do usuário
+POSITION_FIELDS = ("subarea", "level", "module_index", "lesson_index", "step_index")
+
+
+@transactional
+def _update_position_in_transaction(transaction, user_ref, expected: Dict[str, Any], updates: Dict[str, Any]) -> bool:
+    snapshot = user_ref.get(field_paths=["progress.current"], transaction=transaction)
+    current = ((snapshot.to_dict() or {}).get("progress") or {}).get("current") or {}
+    if any(current.get(field) != value for field, value in expected.items()):
+        return False
+
+    transaction.update(user_ref, updates)
+    return True
+
+
+def update_position_if_unchanged(db, user_id: str, expected: Dict[str, Any], updates: Dict[str, Any]) -> bool:
+    """
+    Grava uma nova posição somente se a posição armazenada ainda for a esperada
+
+    Em uma transação, relê progress.current e compara com expected (campos de
+    POSITION_FIELDS). Uma navegação concorrente (outro dispositivo) não é
+    sobrescrita por um avanço calculado a partir da posição antiga.
+
+    Returns:
+        False se a posição mudou desde a leitura e nada foi gravado
+    """
+    user_ref = db.collection(Collections.USERS).document(user_id)
+    return _update_position_in_transaction(db.transaction(), user_ref, expected, updates)
 
 
 def get_user_progress(db, user_id: str) -> Optional[Dict[str, Any]]:
     """
     Obtém o progresso atual do usuário
+
+    Leituras repetidas em poucos segundos (rotas disparadas juntas no carregamento
+    da página) são servidas do cache local; invalidate_progress_cache o descarta
+    nas escritas deste processo.
     """
+    progress = user_progress_cache.get(user_id)
+    if progress is not None:
+        return progress
+
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
+    user_doc = user_ref.get(field_paths=["progress"])
 
     if not user_doc.exists:
         return None
 
-    user_data = user_doc.to_dict()
-    return user_data.get("progress", {})
+    progress = user_doc.to_dict().get("progress", {})
+    user_progress_cache.set(user_id, progress)
+    return progress
 
 
-def advance_user_progress(db, user_id: str, step_type: str) -> Optional[Dict[str, Any]]:
+def advance_user_progress(db, user_id: str, step_type: str, batch=None) -> Optional[Dict[str, Any]]:
     """
     Avança o progresso do usuário baseado no tipo de passo
 
@@ -26,12 +372,14 @@ def advance_user_progress(db, user_id: str, step_type: str) -> Optional[Dict[str
         db: Referência do Firestore
         user_id: ID do usuário
         step_type: Tipo de avanço ("lesson", "module", "level")
+        batch: WriteBatch (ou coletor compatível) que recebe a escrita em vez de
+            gravá-la imediatamente
 
     Returns:
         Novo progresso ou None se houver erro
     """
     user_ref = db.collection(Collections.USERS).document(user_id)
-    user_doc = user_ref.get()
+    user_doc = user_ref.get(field_paths=["progress"])
 
     if not user_doc.exists:
         return None
@@ -64,82 +412,146 @@ def advance_user_progress(db, user_id: str, step_type: str) -> Optional[Dict[str
             # Se não há próximo nível, não avançar
             return current
 
-    # Atualizar no banco
     progress["current"] = new_current
-    user_ref.update({"progress": progress})
+
+    # Porcentagem desnormalizada para a nova posição
+    area = progress.get("area", "")
+    area_index = get_area_data(db, area) if area else None
+    if area_index is not None:
+        percentage_update = build_progress_percentage_update(
+            area_index,
+            area,
+            new_current.get("subarea", ""),
+            new_current.get("level", "iniciante"),
+            new_current.get("module_index", 0),
+            new_current.get("lesson_index", 0)
+        )
+        progress["percentage"] = percentage_update["progress.percentage"]
+        progress["percentage_position"] = percentage_update["progress.percentage_position"]
+
+    # Atualizar no banco
+    progress_update = {"progress": progress, "updated_at": SERVER_TIMESTAMP}
+    if batch is not None:
+        batch.update(user_ref, progress_update)
+    else:
+        user_ref.update(progress_update)
+    user_progress_cache.cache.pop(user_id, None)
 
     return new_current
 
 
-def calculate_progress_percentage(db, user_id: str, progress: Dict[str, Any]) -> float:
+def compute_progress_percentage(
+        area_index: Dict[str, Any],
+        subarea: str,
+        level: str,
+        module_index: int,
+        lesson_index: int
+) -> float:
     """
-    Calcula a porcentagem de progresso do usuário no nível atual
+    Calcula a porcentagem de lições concluídas no nível a partir do índice da área
     """
-    current = progress.get("current", {})
-    area = progress.get("area", "")
-    subarea = current.get("subarea", "")
-    level = current.get("level", "iniciante")
-
-    if not area or not subarea:
+    total_lessons = area_index["level_lessons"].get((subarea, level), 0)
+    if not total_lessons:
         return 0.0
 
-    try:
-        # Buscar dados do currículo
-        area_ref = db.collection(Collections.LEARNING_PATHS).document(area)
-        area_doc = area_ref.get()
+    module_count = area_index["sizes"][(subarea, level)]
 
-        if not area_doc.exists:
-            return 0.0
+    if module_index >= module_count:
+        # Módulos anteriores (100% completos)
+        completed_lessons = total_lessons
+    else:
+        completed_lessons = area_index["lessons_before"][(subarea, level, max(module_index, 0))] + lesson_index
 
-        area_data = area_doc.to_dict()
-        subareas = area_data.get("subareas", {})
+    return min(100.0, completed_lessons / total_lessons * 100)
 
-        if subarea not in subareas:
-            return 0.0
 
-        subarea_data = subareas[subarea]
-        levels = subarea_data.get("levels", {})
+def progress_position_key(area: str, subarea: str, level: str, module_index: int, lesson_index: int) -> str:
+    """
+    Identifica a posição para a qual a porcentagem armazenada foi calculada
+    """
+    return f"{area}|{subarea}|{level}|{module_index}|{lesson_index}"
 
-        if level not in levels:
-            return 0.0
 
-        level_data = levels[level]
-        modules = level_data.get("modules", [])
+def build_saved_progress_update(area: str, area_progress: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Grava o progresso de uma área em saved_progress sem reescrever o mapa inteiro
 
-        if not modules:
-            return 0.0
+    O nome da área contém espaços e acentos, então o caminho do campo é montado
+    com FieldPath.
+    """
+    return {FieldPath("saved_progress", area).to_api_repr(): area_progress}
 
-        # Calcular progresso baseado na posição atual
-        module_index = current.get("module_index", 0)
-        lesson_index = current.get("lesson_index", 0)
 
-        total_modules = len(modules)
+def build_progress_percentage_update(
+        area_index: Dict[str, Any],
+        area: str,
+        subarea: str,
+        level: str,
+        module_index: int,
+        lesson_index: int
+) -> Dict[str, Any]:
+    """
+    Campos a gravar junto de uma mudança de posição para manter a porcentagem
+    desnormalizada em "progress"
+    """
+    return {
+        "progress.percentage": compute_progress_percentage(area_index, subarea, level, module_index, lesson_index),
+        "progress.percentage_position": progress_position_key(area, subarea, level, module_index, lesson_index)
+    }
 
-        # Estimar total de lições
-        total_lessons = 0
-        for module in modules:
-            lessons = module.get("lessons", [])
-            total_lessons += len(lessons)
 
-        # Calcular lições completadas
-        completed_lessons = 0
+def get_stored_progress_percentage(progress: Dict[str, Any]) -> Optional[float]:
+    """
+    Lê a porcentagem armazenada, válida apenas se calculada para a posição atual
 
-        # Módulos anteriores (100% completos)
-        for i in range(min(module_index, len(modules))):
-            module_lessons = modules[i].get("lessons", [])
-            completed_lessons += len(module_lessons)
+    Escritas que substituem "progress" ou movem a posição sem recalcular deixam a
+    chave de posição divergente, e o chamador volta ao cálculo completo.
+    """
+    percentage = progress.get("percentage")
+    if percentage is None:
+        return None
 
-        # Lições do módulo atual
-        if module_index < len(modules):
-            completed_lessons += lesson_index
+    current = progress.get("current", {})
+    position = progress_position_key(
+        progress.get("area", ""),
+        current.get("subarea", ""),
+        current.get("level", "iniciante"),
+        current.get("module_index", 0),
+        current.get("lesson_index", 0)
+    )
+    if progress.get("percentage_position") != position:
+        return None
+
+    return percentage
 
-        # Calcular porcentagem
-        if total_lessons > 0:
-            progress_percentage = (completed_lessons / total_lessons) * 100
-            return min(100.0, progress_percentage)
 
+def calculate_progress_percentage(db, user_id: str, progress: Dict[str, Any]) -> float:
+    """
+    Calcula a porcentagem de progresso do usuário no nível atual
+    """
+    current = progress.get("current", {})
+    area = progress.get("area", "")
+    subarea = current.get("subarea", "")
+    level = current.get("level", "iniciante")
+
+    if not area or not subarea:
         return 0.0
 
+    try:
+        # Currículo indexado (cache em memória)
+        area_index = get_area_data(db, area)
+
+        if area_index is None:
+            return 0.0
+
+        return compute_progress_percentage(
+            area_index,
+            subarea,
+            level,
+            current.get("module_index", 0),
+            current.get("lesson_index", 0)
+        )
+
     except Exception as e:
         print(f"Erro ao calcular progresso: {e}")
         return 0.0
@@ -204,6 +616,63 @@ def get_next_recommendations(db, user_id: str, user_data: Dict[str, Any]) -> Lis
     return recommendations[:5]  # Limitar a 5 recomendações
 
 
+async def claim_completion_async(
+        db,
+        user_id: str,
+        subcollection: str,
+        record_id: str,
+        record: Dict[str, Any]
+) -> bool:
+    """
+    Versão awaitable de claim_completion
+    """
+    return await asyncio.to_thread(claim_completion, db, user_id, subcollection, record_id, record)
+
+
+async def release_completion_async(db, user_id: str, subcollection: str, record_id: str):
+    """
+    Versão awaitable de release_completion
+    """
+    await asyncio.to_thread(release_completion, db, user_id, subcollection, record_id)
+
+
+async def get_user_progress_async(db, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Versão awaitable de get_user_progress (leitura executada em thread)
+    """
+    return await asyncio.to_thread(get_user_progress, db, user_id)
+
+
+async def advance_user_progress_async(
+        db,
+        user_id: str,
+        step_type: str,
+        batch=None
+) -> Optional[Dict[str, Any]]:
+    """
+    Versão awaitable de advance_user_progress (leitura e escrita executadas em thread)
+    """
+    return await asyncio.to_thread(advance_user_progress, db, user_id, step_type, batch)
+
+
+async def calculate_progress_percentage_async(db, user_id: str, progress: Dict[str, Any]) -> float:
+    """
+    Versão awaitable de calculate_progress_percentage (leitura do currículo em thread)
+    """
+    return await asyncio.to_thread(calculate_progress_percentage, db, user_id, progress)
+
+
+def get_next_level_in_order(level: str) -> Optional[str]:
+    """
+    Retorna o nível seguinte em LEVELS_ORDER (None se for o último ou desconhecido)
+    """
+    index = LEVEL_INDEX.get(level)
+    if index is None or index + 1 >= len(LEVELS_ORDER):
+        return None
+
+    return LEVELS_ORDER[index + 1]
+
+
 def get_next_level(current_level: str) -> Optional[str]:
     """
     Determina o próximo nível na sequência
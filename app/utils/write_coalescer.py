@@ -0,0 +1,174 @@
+# app/utils/write_coalescer.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limite de operações por WriteBatch do Firestore é 500; mantemos margem
+MAX_BATCH_OPS = 400
+
+# Escritas de uma requisição: lista de (doc_ref, updates)
+Writes = List[Tuple[Any, Dict[str, Any]]]
+
+
+def _fields_overlap(field_a: str, field_b: str) -> bool:
+    """Indica se dois caminhos de campo se sobrepõem ("a" e "a.b", por exemplo)"""
+    return field_a == field_b or field_a.startswith(field_b + ".") or field_b.startswith(field_a + ".")
+
+
+def fuse_writes(writes: Writes) -> Writes:
+    """
+    Funde updates consecutivos do mesmo documento em um único update
+
+    Os helpers (XP, badge, progresso) preparam escritas separadas para o
+    documento do usuário; dentro de um batch atômico elas podem ser gravadas
+    como uma só, desde que não toquem os mesmos campos. Um update que conflita
+    com o anterior do mesmo documento permanece separado, preservando a ordem.
+    """
+    fused: Writes = []
+    last_by_path: Dict[str, int] = {}
+
+    for doc_ref, updates in writes:
+        index = last_by_path.get(doc_ref.path)
+        if index is not None:
+            previous = fused[index][1]
+            if not any(_fields_overlap(field, other) for field in updates for other in previous):
+                fused[index] = (doc_ref, {**previous, **updates})
+                continue
+
+        last_by_path[doc_ref.path] = len(fused)
+        fused.append((doc_ref, dict(updates)))
+
+    return fused
+
+
+class PendingWrites:
+    """
+    Coleta updates com a mesma interface de WriteBatch.update
+
+    Permite que helpers que aceitam um batch preparem suas escritas para que a
+    requisição as grave de uma vez via WriteCoalescer.update_many.
+    """
+
+    def __init__(self):
+        self.ops: Writes = []
+
+    def update(self, reference, field_updates: Dict[str, Any]):
+        self.ops.append((reference, field_updates))
+
+
+class WriteCoalescer:
+    """
+    Agrupa atualizações concorrentes do mesmo usuário em um único WriteBatch
+
+    Cada chamada a update()/update_many() entra na fila do usuário e aguarda a
+    confirmação. A primeira entrada da fila agenda um commit após
+    flush_interval; as que chegarem nesse intervalo vão no mesmo batch,
+    evitando disputa de escrita no mesmo documento. Se a fila atingir
+    max_batch_ops operações, o commit é imediato. As escritas de uma mesma
+    entrada nunca são divididas entre batches, então são gravadas atomicamente.
+
+    Trade-off: cada escrita passa a ser confirmada em até flush_interval, e uma
+    falha no batch é propagada para todas as entradas que ele continha.
+    """
+
+    def __init__(self, flush_interval: float = 0.1, max_batch_ops: int = MAX_BATCH_OPS):
+        self.flush_interval = flush_interval
+        self.max_batch_ops = max_batch_ops
+        self._pending: Dict[str, List[Tuple[Writes, asyncio.Future]]] = {}
+        self._dbs: Dict[str, Any] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def update(self, db, key: str, doc_ref, updates: Dict[str, Any]):
+        """
+        Enfileira doc_ref.update(updates) e aguarda o commit do batch
+
+        Args:
+            key: Chave de agrupamento (normalmente o user_id)
+        """
+        await self.update_many(db, key, [(doc_ref, updates)])
+
+    async def update_many(self, db, key: str, writes: Writes):
+        """
+        Enfileira várias escritas que devem ser gravadas no mesmo batch
+        """
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((writes, future))
+        self._dbs[key] = db
+
+        if sum(len(entry_writes) for entry_writes, _ in pending) >= self.max_batch_ops:
+            # Fila cheia: não esperar o intervalo
+            entries = self._pending.pop(key)
+            asyncio.create_task(self._commit(db, key, entries))
+        elif key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._drain(key))
+
+        return await future
+
+    async def _drain(self, key: str):
+        """Aguarda o intervalo e grava tudo o que se acumulou para a chave"""
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._tasks.pop(key, None)
+
+        entries = self._pending.pop(key, [])
+        db = self._dbs.pop(key, None)
+        if entries:
+            await self._commit(db, key, entries)
+
+    def _chunk_entries(self, entries: List[Tuple[Writes, asyncio.Future]]):
+        """Divide as entradas em grupos de até max_batch_ops operações"""
+        chunk, chunk_ops = [], 0
+        for entry in entries:
+            entry_ops = len(entry[0])
+            if chunk and chunk_ops + entry_ops > self.max_batch_ops:
+                yield chunk
+                chunk, chunk_ops = [], 0
+            chunk.append(entry)
+            chunk_ops += entry_ops
+
+        if chunk:
+            yield chunk
+
+    async def _commit(self, db, key: str, entries: List[Tuple[Writes, asyncio.Future]]):
+        """Grava as entradas em batches de até max_batch_ops operações"""
+        for chunk in self._chunk_entries(entries):
+            batch = db.batch()
+            chunk_writes = [write for writes, _ in chunk for write in writes]
+            for doc_ref, updates in fuse_writes(chunk_writes):
+                batch.update(doc_ref, updates)
+
+            try:
+                await asyncio.to_thread(batch.commit)
+            except Exception as e:
+                logger.error(f"Erro ao gravar batch de {len(chunk)} entrada(s) para {key}: {e}")
+                for _, future in chunk:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for _, future in chunk:
+                if not future.done():
+                    future.set_result(None)
+
+    async def flush(self):
+        """
+        Grava imediatamente todas as filas pendentes (usado no shutdown)
+        """
+        for key in list(self._pending):
+            entries = self._pending.pop(key, [])
+            db = self._dbs.pop(key, None)
+            if entries:
+                await self._commit(db, key, entries)
+
+        # Os drains ainda agendados encontram as filas vazias
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Instância global do coalescedor de escritas
+write_coalescer = WriteCoalescer()